@@ -6,17 +6,153 @@ This is the main file for the project that executes the tasks of the Asin interp
 Aside from running the interpreter with ./asin <filename>, you may also enter the
 command python asin.py <filename> which would work just as well.
 
+Running ./asin --repl starts the interactive mode (see 'asinrepl.py'), which runs
+statements as they are entered.
+
+Running ./asin --batch <dir|glob> runs every program in the directory (or matching the
+pattern) through a pool of worker processes, one per core or --workers=<count>, and
+reports the time each took and the errors that stopped them (see 'asinbatch.py').
+
+Running ./asin --build-tables generates the lexer and parser tables into the cache
+beforehand (see 'asincache.py'), e.g. for deployments where Asin cannot write them.
+
+Passing --closures before the filename runs the program through the closure
+compiler (see 'asinclosure.py') instead of walking the syntax tree, while --compile
+translates it into Python bytecode (see 'asintranspile.py'), cached in __asincache__.
+Source code is lexed in a single pass over it (see 'asinlex.py'), or by the lexer
+generated by PLY with --ply-lexer.
+With --timing, the time spent importing, loading cached trees, lexing, parsing and executing
+is reported. Parsed trees are cached in __asincache__ as well (see 'asininterpreter.py').
+Runs may be limited with --max-steps=<count> (turns of loops, in all), --timeout=<seconds>
+and --max-memory=<bytes> (of an array grown by idagdag), see 'asinlimits.py'.
+With --profile (or --profile=<file>), the time spent on each node and source line is
+reported, and written to the file as JSON or callgrind data (see 'asinprofile.py').
+
+What a program prints is kept in a buffer of 64 KiB (or --buffer=<bytes>) and written
+out when it fills up, before pahingi() waits for input, and when the program ends or
+fails; --unbuffered writes out every line as soon as it is printed instead.
+
+The lexer, the parser and the rest of the interpreter are only imported and built
+when a file is actually run, so that printing the guide stays fast.
+
 ======================================================================================
 --------------------------------------------------------------------------------------
 '''
+import os
 import sys
-from asinyacc import *
+import time
+import importlib
 from asinerrs import *
-from asintable import asin
+from asintiming import Timings
 
+started = time.perf_counter()
 sys.tracebacklimit = 5
-arglen = len(sys.argv)
-if arglen == 1:
+
+# time spent in each phase of running a file, reported with --timing
+timed = Timings()
+
+# size (in bytes) of the buffer of stdout, unless given with --buffer=<bytes>
+OUTPUT_BUFFER = 1 << 16
+
+def bufferOutput():
+    '''
+    Replaces stdout with one whose buffer is owned by the interpreter, sized with
+    --buffer=<bytes>; with --unbuffered (or --buffer=0), stdout is flushed after
+    every line instead
+    '''
+    size = OUTPUT_BUFFER
+    for option in options:
+        if option.startswith('--buffer='):
+            size = int(option[len('--buffer='):])
+    if size < 0:
+        raise ValueError('--buffer=<bytes> takes a size of 0 bytes or more, not {}'.format(size))
+    if '--unbuffered' in options or size == 0:
+        # text streams cannot go without a buffer, so they are flushed by line
+        sys.stdout.reconfigure(line_buffering=True, write_through=True)
+        return
+    sys.stdout = open(sys.stdout.fileno(), 'w', buffering=size, encoding=sys.stdout.encoding,
+                      errors=sys.stdout.errors, closefd=False)
+
+def chosenBackend():
+    '''
+    Returns how programs are run: through Python bytecode (--compile),
+    closures (--closures), or by walking the syntax tree
+    '''
+    if '--compile' in options:
+        return 'compile'
+    elif '--closures' in options:
+        return 'closures'
+    return 'tree'
+
+def chosenLimits():
+    '''
+    Returns the limits set on runs with --max-steps=<count>, --timeout=<seconds>
+    and --max-memory=<bytes> (see asinlimits.py), or None if there are none
+    '''
+    settings = {}
+    for option in options:
+        name, _, value = option.partition('=')
+        if name == '--max-steps':
+            settings['steps'] = int(value)
+        elif name == '--timeout':
+            settings['seconds'] = float(value)
+        elif name == '--max-memory':
+            settings['memory'] = int(value)
+    if not settings:
+        return None
+    asinlimits = timed('import', importlib.import_module, 'asinlimits')
+    return asinlimits.Limits(**settings)
+
+def profiled():
+    '''
+    Whether the program is profiled, with --profile or --profile=<file>
+    '''
+    return any(option == '--profile' or option.startswith('--profile=') for option in options)
+
+def reportTimings():
+    phases = ['import', 'load', 'lex', 'parse', 'optimize', 'resolve', 'compile', 'execute']
+    report = ', '.join('{} {:.2f} ms'.format(phase, timed.timings[phase] * 1000) for phase in phases if phase in timed.timings)
+    print('Asin timing: {}, total {:.2f} ms'.format(report, (time.perf_counter() - started) * 1000), file=sys.stderr)
+
+# options (e.g. --closures) are separated from the file passed to the interpreter
+options = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+arguments = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+arglen = len(arguments) + 1
+if '--build-tables' in options:
+    '''
+    Generate the lexer and parser tables into the cache directory
+    (or into $ASIN_CACHE_DIR if set) and report where they are
+    '''
+    import asincache
+    import asinlex
+    import asinyacc
+    # the single-pass lexer needs no table, but --ply-lexer's is generated as well
+    asinlex.lexerFromCache()
+    asinyacc.buildParser()
+    for kind, name in (('lexer', asinlex.lexTableName() + '.py'), ('parser', asinyacc.parseTableName())):
+        path = asincache.tablePath(name)
+        if os.path.exists(path):
+            print("Asin {} table is {}".format(kind, path))
+        else:
+            print("Asin {} table could not be written into {}".format(kind, os.path.dirname(path)), file=sys.stderr)
+elif '--repl' in options and arglen == 1:
+    '''
+    Read and run statements interactively
+    '''
+    from asinrepl import repl
+    repl()
+elif '--batch' in options and arglen == 2:
+    '''
+    Run many programs at once, in worker processes
+    '''
+    from asinbatch import batch
+    workers = None
+    for option in options:
+        if option.startswith('--workers='):
+            workers = int(option[len('--workers='):])
+    if batch(arguments[0], chosenBackend(), workers, chosenLimits()):
+        sys.exit(1)
+elif arglen == 1:
     '''
     If no command line parameter pertaining to a file for use with Asin is
     specified, print a guiding message.
@@ -31,9 +167,14 @@ if arglen == 1:
         gamitin ang interpreter ng Asin, maaari lamang sanang iyong sundin
         ang panuto sa ibaba upang patakbuhin ang iyong program:
 
-            Unix-like OS: ./asin <filename>
-            Windows     : asin.exe <filename>
+            Unix-like OS: ./asin [--closures | --compile] [--timing] [--profile[=<file>]] [--buffer=<bytes> | --unbuffered] <filename>
+            Windows     : asin.exe [--closures | --compile] [--timing] [--profile[=<file>]] [--buffer=<bytes> | --unbuffered] <filename>
+
+        To enter statements interactively, run ./asin --repl (asin.exe --repl).
+        To run many programs at once, run ./asin --batch [--workers=<count>] <dir|glob>.
+        To limit a run, add --max-steps=<count>, --timeout=<seconds> or --max-memory=<bytes>.
     """
+    from asintable import asin
     asin()
     print(guide)
 elif arglen == 2:
@@ -42,31 +183,46 @@ elif arglen == 2:
     interpreter executable, and only one file, parse and perform the instructions as compliant
     with the syntax of Asin.
     '''
+    profiler = None
     try:
         '''
         Run the program through the Asin interpreter
         '''
-        source = open(sys.argv[1], 'r')
-        sourceCode = source.read()
-        sourceLines = source.readlines()
-
-        parser = buildParser()
-        program = parser.parse(sourceCode)
-
-        for grain in program.grains:
-            grain.pinch()
+        bufferOutput()
+        with open(arguments[0], 'r') as source:
+            sourceCode = source.read()
 
-        source.close()
+        asininterpreter = timed('import', importlib.import_module, 'asininterpreter')
+        interpreter = asininterpreter.Interpreter(timed=timed if '--timing' in options else None,
+                                                  cached=True, lexer='ply' if '--ply-lexer' in options else 'regex',
+                                                  limits=chosenLimits())
+        if profiled():
+            asinprofile = timed('import', importlib.import_module, 'asinprofile')
+            profiler = asinprofile.Profiler(sourceCode, arguments[0])
+            interpreter.profile(sourceCode, arguments[0], profiler)
+        else:
+            interpreter.run(sourceCode, arguments[0], chosenBackend())
     except FileNotFoundError:
         '''
         If file does not existent
         '''
-        raise MaalatAtNawawalangFile(sys.argv[1])
+        raise MaalatAtNawawalangFile(arguments[0])
     except Exception as alat:
         '''
         If some other error occurs
         '''
+        # whatever was printed before the error is written out first
+        sys.stdout.flush()
         print(alat.__class__.__name__ + ' ' + str(alat), file=sys.stderr)
+    finally:
+        sys.stdout.flush()
+        if profiler is not None:
+            profiler.report()
+            for option in options:
+                if option.startswith('--profile='):
+                    profiler.dump(option[len('--profile='):])
+        if '--timing' in options:
+            reportTimings()
 else:
     '''
     If more than one argument file is passed after the asin.exe interpreter executable,
@@ -78,5 +234,5 @@ else:
 
         Sundin ang panuto:
             ./asin <filename>
-    """.format(arglen - 1, sys.argv[1])
+    """.format(arglen - 1, arguments[0])
     print(guide)
\ No newline at end of file
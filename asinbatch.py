@@ -0,0 +1,119 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the batch mode of Asin, started with ./asin --batch <dir|glob>, which
+runs many programs at once: every .asin file in the directory, or every file matching
+the glob pattern (e.g. "jobs/**/*.asin").
+
+Programs are run by a pool of worker processes, one per core unless --workers=<count>
+is given. Each worker builds its lexer and parser once (see 'asininterpreter.py') and
+then runs every program it is handed with a fresh interpreter of its own, so that a
+program starts without paying for Python's startup, the imports or the parser.
+
+What each program prints is collected and written out, in the order of the files, after
+a header naming the file; what it reads with pahingi() comes from the file beside it
+ending in .in (e.g. job.asin.in), if there is one. The time each program took, and the
+error that stopped it (if any), are reported on stderr. The limits given with
+--max-steps, --timeout and --max-memory (see 'asinlimits.py') apply to each program.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import io
+import os
+import sys
+import glob
+import time
+import multiprocessing
+from asininterpreter import Interpreter
+
+# extension of the file a program reads its input from, appended to its own name
+INPUT_EXTENSION = '.in'
+
+# interpreter of the worker process, whose lexer and parser every job shares
+worker = None
+
+def findJobs(pattern):
+    '''
+    Returns the files to run: the .asin files in the directory, or the
+    files matching the glob pattern, in sorted order
+    '''
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.asin')
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+def startWorker(backend, limits=None):
+    '''
+    Builds the interpreter of a worker process before it is handed any job
+    '''
+    global worker
+    worker = Interpreter(limits=limits)
+    worker.build()
+    for name in ('asinresolver', 'asinclosure' if backend == 'closures' else 'asintranspile'):
+        worker.module(name)
+
+def runJob(job):
+    '''
+    Runs one program and returns its path, what it printed, the error that
+    stopped it (as its class name and message, or None) and the time it took
+    '''
+    path, backend = job
+    began = time.perf_counter()
+    stdout = io.StringIO()
+    error = None
+    try:
+        with open(path, 'r') as source:
+            sourceCode = source.read()
+        stdin = io.StringIO()
+        if os.path.isfile(path + INPUT_EXTENSION):
+            with open(path + INPUT_EXTENSION, 'r') as inputFile:
+                stdin = io.StringIO(inputFile.read())
+        worker.sibling(stdin, stdout).run(sourceCode, path, backend)
+    except Exception as alat:
+        error = (alat.__class__.__name__, str(alat))
+    return path, stdout.getvalue(), error, time.perf_counter() - began
+
+def batch(pattern, backend='tree', workers=None, limits=None):
+    '''
+    Runs every program found with the pattern, each within the limits if given
+    (see asinlimits.py), then reports how many failed. Returns the number of
+    programs that failed
+    '''
+    paths = findJobs(pattern)
+    if not paths:
+        print("Asin batch: walang nahanap na file sa \"{}\"".format(pattern), file=sys.stderr)
+        return 0
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+
+    began = time.perf_counter()
+    jobs = [(path, backend) for path in paths]
+    if workers == 1:
+        startWorker(backend, limits)
+        failed = report(map(runJob, jobs))
+    else:
+        # jobs are handed out in chunks, so that workers seldom wait on the pool
+        chunksize = max(1, len(jobs) // (workers * 8))
+        with multiprocessing.Pool(workers, initializer=startWorker, initargs=(backend, limits)) as pool:
+            failed = report(pool.imap(runJob, jobs, chunksize))
+
+    print('Asin batch: {} programs, {} failed, {:.2f} ms on {} workers'.format(
+        len(paths), failed, (time.perf_counter() - began) * 1000, workers), file=sys.stderr)
+    return failed
+
+def report(results):
+    '''
+    Writes out what each program printed, as its results come in, along with the
+    time it took and its error on stderr. Returns the number of programs that failed
+    '''
+    failed = 0
+    for path, output, error, elapsed in results:
+        print('==> {} <=='.format(path))
+        sys.stdout.write(output)
+        sys.stdout.flush()
+        if error is None:
+            print('{}: {:.2f} ms'.format(path, elapsed * 1000), file=sys.stderr)
+        else:
+            failed += 1
+            print('{}: {:.2f} ms, {} {}'.format(path, elapsed * 1000, *error), file=sys.stderr)
+    return failed
@@ -0,0 +1,185 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the on-disk cache of Asin. Artifacts derived from a source file
+(e.g. compiled code objects) are stored in a __asincache__ directory beside the file,
+named after a hash of the source code and of the interpreter itself, so that editing
+either the program or Asin invalidates them. The lexer and parser tables generated by
+PLY are kept in the __asincache__ directory beside the interpreter.
+
+Setting the environment variable ASIN_CACHE_DIR places every cached artifact in that
+directory instead; deployments where the interpreter is read-only may prebuild the
+tables there with ./asin --build-tables.
+
+Artifacts are evicted least recently used first once those in a directory take up more
+than 64 MiB (or ASIN_CACHE_SIZE bytes); an artifact is used whenever it is loaded. The
+lexer and parser tables are never evicted, but those of an older grammar are removed
+once the tables of the current one are written.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import os
+import sys
+import glob
+import hashlib
+import threading
+
+CACHE_DIRECTORY = '__asincache__'
+CACHE_VARIABLE = 'ASIN_CACHE_DIR'
+SIZE_VARIABLE = 'ASIN_CACHE_SIZE'
+
+# bytes that the artifacts in a cache directory may take up, unless given with $ASIN_CACHE_SIZE
+MAX_CACHE_SIZE = 64 << 20
+
+# extensions of the artifacts that may be evicted: compiled code objects and parsed trees
+ARTIFACT_EXTENSIONS = ('.asinc', '.asint')
+
+# hexadecimal digits of the digest that names the lexer and parser tables
+DIGEST_LENGTH = 16
+
+# digest of the interpreter's own files, computed once per run
+_interpreterDigest = None
+
+def interpreterDigest():
+    '''
+    Returns a digest of the interpreter's source files and of the running Python
+    version; cached artifacts made by another version of either are never reused
+    '''
+    global _interpreterDigest
+    if _interpreterDigest is None:
+        digest = hashlib.sha256(sys.implementation.cache_tag.encode())
+        for module in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'asin*.py'))):
+            with open(module, 'rb') as moduleFile:
+                digest.update(moduleFile.read())
+        _interpreterDigest = digest.hexdigest()
+    return _interpreterDigest
+
+def sourceKey(sourceCode, *variant):
+    '''
+    Returns the key under which artifacts of the given source code are cached;
+    artifacts made differently from the same source (e.g. code compiled with
+    limits) are told apart by the variant
+    '''
+    digest = hashlib.sha256(interpreterDigest().encode())
+    digest.update(sourceCode.encode())
+    if variant:
+        digest.update(repr(variant).encode())
+    return digest.hexdigest()
+
+def cachePath(filename, key, extension):
+    '''
+    Returns the path of a cached artifact of the file, e.g.
+    dir/__asincache__/<key>.asinc for dir/program.asin
+    '''
+    directory = os.environ.get(CACHE_VARIABLE) or os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIRECTORY)
+    return os.path.join(directory, key + extension)
+
+def tablePath(name):
+    '''
+    Returns the path of a table file generated by PLY
+    '''
+    directory = os.environ.get(CACHE_VARIABLE) or os.path.join(os.path.dirname(os.path.abspath(__file__)), CACHE_DIRECTORY)
+    return os.path.join(directory, name)
+
+def removeStaleTables(path):
+    '''
+    Removes the tables generated for other grammars than the table at the path,
+    e.g. every other asinparsetab_<digest>.pickle, once it has been written; the
+    bytecode compiled from them (for the lexer's tables) is removed as well
+    '''
+    directory, name = os.path.split(path)
+    stem, extension = os.path.splitext(name)
+    pattern = stem[:stem.rindex('_') + 1] + '?' * DIGEST_LENGTH
+    stale = glob.glob(os.path.join(glob.escape(directory), pattern + extension))
+    stale += glob.glob(os.path.join(glob.escape(directory), '__pycache__', pattern + '.*.pyc'))
+    for table in stale:
+        if not os.path.basename(table).startswith(stem + '.'):
+            try:
+                os.remove(table)
+            except OSError:
+                # removed by a concurrent run
+                pass
+
+def grammarDigest(moduleDict, prefix, *extras):
+    '''
+    Returns a digest of the rules (named with the prefix, e.g. "p_") defined
+    in a lex or yacc module, so that tables are rebuilt when the grammar changes
+    '''
+    digest = hashlib.sha256(repr(extras).encode())
+    for name, rule in sorted(moduleDict.items()):
+        if name.startswith(prefix):
+            digest.update(name.encode())
+            digest.update(repr(rule if isinstance(rule, str) else rule.__doc__).encode())
+    return digest.hexdigest()[:DIGEST_LENGTH]
+
+def load(path):
+    '''
+    Returns the contents of a cached artifact, or None if it is not cached
+    '''
+    try:
+        with open(path, 'rb') as cached:
+            data = cached.read()
+    except OSError:
+        return None
+    try:
+        # marks the artifact as recently used, so that it is evicted last
+        os.utime(path)
+    except OSError:
+        pass
+    return data
+
+def store(path, data):
+    '''
+    Writes an artifact into the cache. The file is written under a temporary
+    name first so that concurrent runs never read a partially written artifact.
+    A cache that cannot be written to is silently left alone
+    '''
+    try:
+        temporary = temporaryPath(path)
+        with open(temporary, 'wb') as cached:
+            cached.write(data)
+        os.replace(temporary, path)
+        evict(os.path.dirname(path))
+    except OSError:
+        pass
+
+def evict(directory):
+    '''
+    Removes the least recently used artifacts in the cache directory until
+    the rest take up no more than $ASIN_CACHE_SIZE (or MAX_CACHE_SIZE) bytes
+    '''
+    limit = int(os.environ.get(SIZE_VARIABLE) or MAX_CACHE_SIZE)
+    artifacts = []
+    total = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(ARTIFACT_EXTENSIONS):
+                try:
+                    status = entry.stat()
+                except OSError:
+                    # removed by a concurrent run
+                    continue
+                artifacts.append((status.st_mtime, status.st_size, entry.path))
+                total += status.st_size
+    if total <= limit:
+        return
+    for _, size, path in sorted(artifacts):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+        if total <= limit:
+            break
+
+def temporaryPath(path):
+    '''
+    Returns the name under which an artifact is written before being moved to
+    its path, creating the cache directory if needed. The name is unique, so that
+    runs writing the same artifact at once (in other processes, or other threads
+    of the same one) never write into the same file
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
@@ -0,0 +1,413 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the closure compiler of Asin. Instead of walking the abstract
+syntax tree through pinch() every time a node is evaluated, the tree is turned once
+into nested Python closures; operators, variable slots (see 'asinresolver.py') and
+built-in functions are resolved while compiling, so running a program only calls the
+closures.
+
+The closures behave exactly as the pinch() methods of the nodes in 'asinnodes.py',
+errors included. Statement closures return True when a 'lumisan' is reached, which
+tells the enclosing loop to stop.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+from asinerrs import *
+from asinnodes import *
+
+def compileProgram(program: SaltBlock):
+    '''
+    Compiles the SaltBlock returned by the parser (after it was resolved)
+    and returns a function that runs the program when called
+    '''
+    statements = [compileGrain(grain) for grain in program.grains]
+
+    def runProgram():
+        # an exit outside of a loop only ends the top-level statement it is in
+        for statement in statements:
+            statement()
+    return runProgram
+
+def compileGrain(grain):
+    '''
+    Compiles a node of the abstract syntax tree through the
+    compiling function registered for its class
+    '''
+    return COMPILERS[grain.__class__](grain)
+
+def compileStatement(grain):
+    '''
+    Compiles a statement within a block. The values returned by function calls
+    are discarded, as only the exit signal may come out of a statement
+    '''
+    compiled = compileGrain(grain)
+    if isinstance(grain, AsinFunctionCall):
+        def callStmt():
+            compiled()
+        return callStmt
+    return compiled
+
+def compileBlock(block: SaltBlock):
+    statements = tuple(compileStatement(grain) for grain in block)
+    if len(statements) == 1:
+        return statements[0]
+
+    def runBlock():
+        for statement in statements:
+            if statement():
+                return True
+    return runBlock
+
+def compileLoopBody(block: SaltBlock):
+    '''
+    Compiles the body of a loop. A LimitCheck that the resolver placed at its end
+    (see asinlimits.py) is done within the body's closure, after the rest of it
+    '''
+    if not block.grains or not isinstance(block.grains[-1], LimitCheck):
+        return compileBlock(block)
+    limits = block.grains[-1].limits
+    loopBody = compileBlock(SaltBlock(block.grains[:-1]))
+
+    def limitedBody():
+        if loopBody():
+            return True
+        # as Limits.tick()
+        limits.left -= 1
+        if limits.left <= 0:
+            limits.check()
+    return limitedBody
+
+def compileExprList(block: ExprList):
+    '''
+    Compiles comma-separated expressions (printing, arrays); like ExprList.pinch(),
+    the list built upon evaluation leaves out values that are None
+    '''
+    expressions = tuple(compileGrain(grain) for grain in block)
+
+    def exprList():
+        values = []
+        for expression in expressions:
+            value = expression()
+            if value is not None:
+                values.append(value)
+        return values
+    return exprList
+
+# ====================================================================================
+#                              ~: Expression compilers :~
+# ====================================================================================
+
+def compilePrimitive(grain: Primitive):
+    value = grain.value
+
+    def primitive():
+        return value
+    return primitive
+
+def compileIdentifier(grain: Identifier):
+    name = grain.identifier
+    values = grain.values
+    slot = grain.slot
+
+    def identifier():
+        value = values[slot]
+        if value is UNBOUND:
+            raise MaalatNaSimbolo(name)
+        return value
+    return identifier
+
+def compileArray(grain: Array):
+    if grain.entries is None:
+        def emptyArray():
+            return []
+        return emptyArray
+    return compileExprList(grain.entries)
+
+def compileBinOp(grain: BinOp):
+    op = grain.op
+    function = BINOPS[op]
+    left = compileGrain(grain.left)
+
+    if isinstance(grain.right, Primitive):
+        # the right operand is known beforehand; e.g. "i % 3", "n - 1"
+        right = grain.right.value
+
+        def binOpConst():
+            leftVal = left()
+            try:
+                return function(leftVal, right)
+            except TypeError:
+                raise MaalatNaOperasyon(leftVal, op, right, leftVal.__class__.__name__, op, right.__class__.__name__)
+            except ArithmeticError:
+                raise MaalatNaAritmetika(leftVal.__class__.__name__, leftVal)
+        return binOpConst
+
+    right = compileGrain(grain.right)
+
+    def binOp():
+        leftVal = left()
+        rightVal = right()
+        try:
+            return function(leftVal, rightVal)
+        except TypeError:
+            raise MaalatNaOperasyon(leftVal, op, rightVal, leftVal.__class__.__name__, op, rightVal.__class__.__name__)
+        except ArithmeticError:
+            raise MaalatNaAritmetika(leftVal.__class__.__name__, leftVal)
+    return binOp
+
+def compileOpChain(grain: OpChain):
+    first = compileGrain(grain.first)
+    steps = tuple((op, BINOPS[op], compileGrain(operand)) for op, operand in grain.steps)
+
+    def opChain():
+        leftVal = first()
+        for op, function, right in steps:
+            rightVal = right()
+            try:
+                leftVal = function(leftVal, rightVal)
+            except TypeError:
+                raise MaalatNaOperasyon(leftVal, op, rightVal, leftVal.__class__.__name__, op, rightVal.__class__.__name__)
+            except ArithmeticError:
+                raise MaalatNaAritmetika(leftVal.__class__.__name__, leftVal)
+        return leftVal
+    return opChain
+
+def compileUnaOp(grain: UnaOp):
+    expression = compileGrain(grain.expression)
+    if grain.op == 'hindi':
+        def negation():
+            return not expression()
+        return negation
+
+    def minus():
+        operand = expression()
+        try:
+            return -operand
+        except TypeError:
+            raise MaalatNaOperasyon('-', operand.__class__.__name__, '-', operand)
+    return minus
+
+def compileArrAccess(grain: ArrAccess):
+    array = compileGrain(grain.arrName)
+    index = compileGrain(grain.index)
+
+    def arrAccess():
+        arrId = array()
+        elemPos = index()
+        if elemPos.__class__ is int:
+            try:
+                return arrId[elemPos]
+            except (IndexError, TypeError):
+                pass
+        raise indexFailure(arrId, elemPos)
+    return arrAccess
+
+def compileFunctionCall(grain: AsinFunctionCall):
+    function = grain.function
+    arguments = tuple(compileGrain(arg) for arg in grain.arguments or ())
+    argc = len(arguments)
+
+    if argc == 0:
+        return function
+    elif argc == 1:
+        first, = arguments
+
+        def call1():
+            return function(first())
+        return call1
+    elif argc == 2:
+        first, second = arguments
+
+        def call2():
+            return function(first(), second())
+        return call2
+    elif argc == 3:
+        first, second, third = arguments
+
+        def call3():
+            return function(first(), second(), third())
+        return call3
+
+    def call():
+        return function(*[argument() for argument in arguments])
+    return call
+
+# ====================================================================================
+#                              ~: Statement compilers :~
+# ====================================================================================
+
+def compileAssignStmt(grain: AssignStmt):
+    values = grain.ident.values
+    slot = grain.ident.slot
+    value = compileGrain(grain.value)
+
+    def assign():
+        values[slot] = value()
+    return assign
+
+def compileCompAssignStmt(grain: CompAssignStmt):
+    operator = COMPOPS[grain.op]
+    function = BINOPS[operator]
+    name = grain.ident.identifier
+    values = grain.ident.values
+    slot = grain.ident.slot
+    value = compileGrain(grain.value)
+
+    def compAssign():
+        try:
+            oldVal = values[slot]
+            if oldVal is UNBOUND:
+                raise MaalatNaSimbolo(name)
+            val = value()
+            values[slot] = function(oldVal, val)
+        except TypeError:
+            raise MaalatNaOperasyon(oldVal, operator, val, oldVal.__class__.__name__, operator, val.__class__.__name__)
+    return compAssign
+
+def compileIfStmt(grain: IfStmt):
+    if len(grain.branches) > 1:
+        return compileIfChain(grain)
+    (condition, ifSeg), = grain.branches
+    condition = compileGrain(condition)
+    ifSeg = compileBlock(ifSeg)
+    if grain.elseSeg is None:
+        def ifStmt():
+            if condition():
+                return ifSeg()
+        return ifStmt
+
+    elseSeg = compileBlock(grain.elseSeg)
+
+    def ifElseStmt():
+        if condition():
+            return ifSeg()
+        return elseSeg()
+    return ifElseStmt
+
+def compileIfChain(grain: IfStmt):
+    '''
+    Compiles an if statement with else-ifs, whose branches are tried in a loop
+    '''
+    branches = tuple((compileGrain(condition), compileBlock(block)) for condition, block in grain.branches)
+    elseSeg = compileBlock(grain.elseSeg) if grain.elseSeg is not None else None
+
+    def ifChain():
+        for condition, block in branches:
+            if condition():
+                return block()
+        if elseSeg is not None:
+            return elseSeg()
+    return ifChain
+
+def compileSwitchStmt(grain: SwitchStmt):
+    subject = compileGrain(grain.subject)
+    blocks = [compileBlock(block) for block in grain.blocks]
+    cases = {constant: blocks[position] for constant, position in grain.cases.items()}
+    elseSeg = compileBlock(grain.elseSeg) if grain.elseSeg is not None else None
+
+    def switchStmt():
+        value = subject()
+        try:
+            block = cases.get(value, elseSeg)
+        except TypeError:
+            # values that cannot be looked up (arrays) are equal to none of the constants
+            block = elseSeg
+        if block is not None:
+            return block()
+    return switchStmt
+
+def compileWhileStmt(grain: WhileStmt):
+    condition = compileGrain(grain.condition)
+    loopBody = compileLoopBody(grain.loopBody)
+
+    def whileStmt():
+        while condition():
+            if loopBody():
+                break
+    return whileStmt
+
+def compileForStmt(grain: ForStmt):
+    name = grain.iterator.identifier
+    values = grain.iterator.values
+    slot = grain.iterator.slot
+    start = compileGrain(grain.start)
+    end = compileGrain(grain.end)
+    loopBody = compileLoopBody(grain.loopBody)
+
+    def forStmt():
+        begin = start()
+        finish = end() + 1
+        for count in range(begin, finish):
+            values[slot] = count
+            if loopBody():
+                break
+        if values[slot] is UNBOUND:
+            raise KeyError(name)
+        values[slot] = UNBOUND
+    return forStmt
+
+def compileForEachStmt(grain: ForEachStmt):
+    values = grain.iterator.values
+    slot = grain.iterator.slot
+    iterable = compileGrain(grain.iterable)
+    loopBody = compileLoopBody(grain.loopBody)
+
+    def forEachStmt():
+        for element in elementsOf(iterable()):
+            values[slot] = element
+            if loopBody():
+                break
+        values[slot] = UNBOUND
+    return forEachStmt
+
+def compilePrintStmt(grain: PrintStmt):
+    toPrint = compileExprList(grain.toPrint)
+    stdout = grain.stdout
+
+    def printStmt():
+        print(*toPrint(), file=stdout)
+    return printStmt
+
+def compileExitStmt(grain: ExitStmt):
+    def exitStmt():
+        return True
+    return exitStmt
+
+def compileLimitCheck(grain: LimitCheck):
+    # Limits.tick() returns None, which never stops the loop
+    return grain.limits.tick
+
+def compileHookedStmt(grain: HookedStmt):
+    hook = grain.hook
+    statement = grain.statement
+    compiled = compileStatement(statement)
+
+    def hookedStmt():
+        hook(statement)
+        return compiled()
+    return hookedStmt
+
+COMPILERS = {
+    Primitive: compilePrimitive,
+    Identifier: compileIdentifier,
+    Array: compileArray,
+    BinOp: compileBinOp,
+    OpChain: compileOpChain,
+    UnaOp: compileUnaOp,
+    ArrAccess: compileArrAccess,
+    AsinFunctionCall: compileFunctionCall,
+    AssignStmt: compileAssignStmt,
+    CompAssignStmt: compileCompAssignStmt,
+    IfStmt: compileIfStmt,
+    SwitchStmt: compileSwitchStmt,
+    WhileStmt: compileWhileStmt,
+    ForStmt: compileForStmt,
+    ForEachStmt: compileForEachStmt,
+    PrintStmt: compilePrintStmt,
+    ExitStmt: compileExitStmt,
+    LimitCheck: compileLimitCheck,
+    HookedStmt: compileHookedStmt,
+}
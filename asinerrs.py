@@ -35,6 +35,15 @@ class MaalatAtNawawalangFile(Maalat):
         self.errorReport = "(InexistentFileError) : File \"{}\" not found".format(filename)
     pass
 
+class MaalatNaFile(Maalat):
+    '''
+    MaalatNaFile is analogous to Python's OSError; raised when a file
+    that exists cannot be opened or read in the way asked for
+    '''
+    def __init__(self, filename, action, reason):
+        self.errorReport = "(FileError) : File \"{}\" cannot be {}: {}".format(filename, action, reason)
+    pass
+
 class MaalatNaOperasyon(Maalat):
     '''
     MaalatNaPagpapatakbo is analogous to Python's TypeError;
@@ -97,4 +106,60 @@ class MaalatNaIndeks(Maalat):
             self.errorReport = "(TypeError) : {} ~> \"{}\" is not a valid index; index should be of type int".format(*args)
         else:
             self.errorReport = "(IndexError) : Index (= {}) is not within the list's ({}) index range ({} to {})".format(*args)
-    pass
\ No newline at end of file
+    pass
+
+class MaalatNaUri(Maalat):
+    '''
+    MaalatNaUri is analogous to Python's TypeError for arguments;
+    raised when a built-in function is given a value of the wrong type
+    '''
+    def __init__(self, *args):
+        self.errorReport = "(TypeError) : {} ~> \"{}\" is not a valid argument of {}(); it should be of type {}".format(*args)
+    pass
+
+class MaalatNaHalaga(Maalat):
+    '''
+    MaalatNaHalaga is analogous to Python's ValueError; raised when a value
+    cannot be stored in a typed numeric array (see bilang_hanay and lutang_hanay),
+    or when arrays of different lengths are operated on elementwise
+    '''
+    def __init__(self, *args):
+        if len(args) == 3:
+            self.errorReport = "(ValueError) : {} ~> \"{}\" cannot be stored in an array of {}".format(*args)
+        else:
+            self.errorReport = "(ValueError) : Arrays of lengths {} and {} cannot be operated on elementwise".format(*args)
+    pass
+
+class MaalatNaHangganan(Maalat):
+    '''
+    MaalatNaHangganan is the parent class of the errors raised when a run goes
+    past one of the limits set on it (see asinlimits.py)
+    '''
+    pass
+
+class MaalatNaLabisNaHakbang(MaalatNaHangganan):
+    '''
+    MaalatNaLabisNaHakbang is raised when the loops of a program
+    run more times, in all, than the run allows
+    '''
+    def __init__(self, steps):
+        self.errorReport = "(StepLimitError) : Loops ran past the limit of {} iterations".format(steps)
+    pass
+
+class MaalatNaLabisNaOras(MaalatNaHangganan):
+    '''
+    MaalatNaLabisNaOras is analogous to Python's TimeoutError;
+    raised when a program runs longer than the run allows
+    '''
+    def __init__(self, seconds):
+        self.errorReport = "(TimeoutError) : Program ran past the time limit of {} seconds".format(seconds)
+    pass
+
+class MaalatNaLabisNaMemorya(MaalatNaHangganan):
+    '''
+    MaalatNaLabisNaMemorya is analogous to Python's MemoryError;
+    raised when idagdag() would grow an array past the size the run allows
+    '''
+    def __init__(self, size, limit):
+        self.errorReport = "(MemoryError) : Array of {} bytes would exceed the limit of {} bytes".format(size, limit)
+    pass
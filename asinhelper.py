@@ -15,6 +15,11 @@ class Grain:
     Represents a node in the abstract syntax tree, as do classes that inherit it.
     We called it Grain, as a grain of salt is a singular unit
     '''
+
+    # the line of the source code the node was parsed from (0 if unknown), set by the parser
+    lineno = 0
+    # names of the attributes that hold the nodes below this one (see walkGrains)
+    CHILDREN = ()
     def pinch(self):
         '''
         Generally, pinch() is the function used by the program to evaluate the contents
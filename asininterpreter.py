@@ -0,0 +1,208 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the Interpreter class, which runs Asin programs. An interpreter owns
+its hash table of variables and functions, its lexer and parser, and the streams that
+its programs print to and read input from; programs run by different interpreters share
+none of them, so that many may be run in one process (or in threads, one interpreter
+per thread), e.g.
+
+    output = io.StringIO()
+    Interpreter(stdout=output).run('ilimbag(1 + 2);')
+
+The lexer and the parser (and the modules behind them) are only built when a program
+is first parsed, so that running a cached compiled program (see 'asintranspile.py')
+needs neither. With cached=True (as ./asin runs files), the parsed (and optimized) tree
+of a program read from a file is pickled into the on-disk cache (see 'asincache.py'),
+and loaded from there instead of lexing and parsing the program again the next time the
+same source is run. Programs given without a file (e.g. the '<asin>' above) are never
+cached, as their cache would be written into whatever the current directory is.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import os
+import pickle
+import importlib
+import asintable
+
+# the ways of running a program: walking the tree, closures, or Python bytecode
+BACKENDS = ('tree', 'closures', 'compile')
+
+def untimed(phase, function, *args, **kwargs):
+    return function(*args, **kwargs)
+
+class Interpreter:
+    '''
+    Runs Asin programs with a hash table, lexer, parser and streams of its own
+    '''
+    def __init__(self, stdin=None, stdout=None, timed=None, cached=False, lexer='regex', limits=None):
+        '''
+        stdin and stdout default to the process' own (sys.stdin and sys.stdout).
+        If given, timed(phase, function, *args) is called to run each phase of
+        running a program (see asin.py); lexing is then done before parsing, so
+        that the two are timed apart. Parsed trees are only cached if cached is true,
+        and only for programs read from a file (see cachesFile).
+        lexer is the kind of lexer used, 'regex' or 'ply' (see asinlex.py), and
+        limits are those set on every run (see asinlimits.py), if any
+        '''
+        self.table = asintable.HashTable(stdin, stdout, limits)
+        asintable.kargahan(self.table)
+        self.timed = timed or untimed
+        self.separateLexing = timed is not None
+        self.cached = cached
+        self.lexerKind = lexer
+        self.lexer = None
+        self.parser = None
+
+    def sibling(self, stdin=None, stdout=None):
+        '''
+        Returns a new interpreter with a table and streams of its own, which
+        shares the lexer and the parser of this one (building them if needed). As
+        the lexer and the parser are not thread-safe, an interpreter and its siblings
+        are to be used by one thread at a time (e.g. one after another, as by the
+        workers of asinbatch.py); threads running at once need interpreters of their own
+        '''
+        self.build()
+        limits = self.table.limits
+        interpreter = Interpreter(stdin, stdout, cached=self.cached, lexer=self.lexerKind,
+                                  limits=limits.renewed() if limits is not None else None)
+        interpreter.timed, interpreter.separateLexing = self.timed, self.separateLexing
+        interpreter.lexer, interpreter.parser = self.lexer, self.parser
+        return interpreter
+
+    def module(self, name):
+        '''
+        Imports one of Asin's modules, when it is first needed
+        '''
+        return self.timed('import', importlib.import_module, name)
+
+    def build(self):
+        '''
+        Builds the lexer and the parser, unless they were built before
+        '''
+        if self.parser is None:
+            asinyacc = self.module('asinyacc')
+            self.lexer = self.timed('lex', asinyacc.buildLexer, self.lexerKind)
+            self.parser = self.timed('parse', asinyacc.buildParser)
+
+    def parse(self, sourceCode, filename='<asin>'):
+        '''
+        Returns the optimized tree of the source code, loading it from the on-disk
+        cache when the same source was parsed before
+        '''
+        if not self.cachesFile(filename):
+            return self.parseSource(sourceCode, filename)
+        asincache = self.module('asincache')
+        path = asincache.cachePath(filename, asincache.sourceKey(sourceCode), '.asint')
+        cached = self.timed('load', asincache.load, path)
+        if cached is not None:
+            try:
+                return self.timed('load', pickle.loads, cached)
+            except Exception:
+                # an unreadable tree is parsed again
+                pass
+
+        program = self.parseSource(sourceCode, filename)
+        try:
+            tree = pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # e.g. a tree nested too deeply to be pickled is only kept for this run
+            return program
+        asincache.store(path, tree)
+        return program
+
+    def cachesFile(self, filename):
+        '''
+        Whether what is made of the program in the file is kept in the on-disk cache;
+        a program without a file of its own (e.g. '<asin>') is never cached
+        '''
+        return self.cached and os.path.isfile(filename)
+
+    def parseSource(self, sourceCode, filename):
+        '''
+        Lexes and parses the source code, then optimizes the tree (see asinoptimizer.py)
+        and returns it
+        '''
+        self.build()
+        asinyacc = self.module('asinyacc')
+        self.lexer.source = asinyacc.SourceBuffer(sourceCode, filename)
+        self.lexer.lineno = 1
+        if not self.separateLexing:
+            program = self.parser.parse(sourceCode, lexer=self.lexer)
+        else:
+            self.lexer.input(sourceCode)
+            tokens = self.timed('lex', list, self.lexer)
+            program = self.timed('parse', self.parser.parse, lexer=asinyacc.TokenStream(tokens, self.lexer))
+        asinoptimizer = self.module('asinoptimizer')
+        return self.timed('optimize', asinoptimizer.optimize, program)
+
+    def resolve(self, program):
+        '''
+        Binds the program's variables and functions to the interpreter's table
+        '''
+        asinresolver = self.module('asinresolver')
+        return self.timed('resolve', asinresolver.resolve, program, self.table)
+
+    def run(self, sourceCode, filename='<asin>', backend='tree'):
+        '''
+        Runs the source code of a program through one of the BACKENDS. Its variables
+        are kept in the interpreter's table afterwards (by the compile backend, which
+        keeps them as Python locals, they are copied into it when the program ends)
+        '''
+        if backend not in BACKENDS:
+            raise ValueError('unknown backend {!r}; expected one of {}'.format(backend, ', '.join(BACKENDS)))
+        limits = self.table.limits
+        if limits is not None:
+            if backend == 'compile' and limits.hook is not None:
+                raise ValueError('statement hooks are not called by the compile backend')
+            limits.start()
+        if backend == 'compile':
+            # translate the program into Python bytecode (or load it from
+            # __asincache__ if this source was compiled before, when cached),
+            # then run it; the lexer and parser are only built when the cache misses
+            asintranspile = self.module('asintranspile')
+            code = self.timed('compile', asintranspile.cachedCompile, sourceCode, filename,
+                              lambda code: self.parse(code, filename), self.table, self.cachesFile(filename))
+            self.timed('execute', asintranspile.execute, code, self.table)
+        elif backend == 'closures':
+            # compile the tree into closures once, then run them
+            program = self.resolve(self.parse(sourceCode, filename))
+            asinclosure = self.module('asinclosure')
+            self.timed('execute', self.timed('compile', asinclosure.compileProgram, program))
+        else:
+            program = self.resolve(self.parse(sourceCode, filename))
+            self.timed('execute', self.pinchProgram, program)
+
+    def profile(self, sourceCode, filename='<asin>', profiler=None):
+        '''
+        Runs the source code by walking its tree, with every node timed by the
+        profiler (see asinprofile.py), which is returned; a profiler may be given
+        so that what was measured is kept when the program fails
+        '''
+        asinprofile = self.module('asinprofile')
+        if profiler is None:
+            profiler = asinprofile.Profiler(sourceCode, filename)
+        program = self.parse(sourceCode, filename)
+        # the nodes are gathered before resolving, which binds them to values
+        # (e.g. arrays) that are not to be walked
+        if self.table.limits is not None:
+            self.table.limits.start()
+        grains = list(asinprofile.walkGrains(program))
+        self.resolve(program)
+        profiler.instrument(grains)
+        self.timed('execute', self.pinchProgram, program)
+        return profiler
+
+    def pinchProgram(self, program):
+        '''
+        Runs a resolved program by walking its tree
+        '''
+        LoopExit = self.module('asinnodes').LoopExit
+        for grain in program.grains:
+            try:
+                grain.pinch()
+            except LoopExit:
+                # an exit outside of a loop only ends the top-level statement it is in
+                pass
@@ -6,11 +6,22 @@ This is the lex file for the Asin programming language
 
 Found below are strings and regular expressions that define each token in Asin
 
+Two lexers are built from them: the one generated by PLY, and a single-pass lexer
+(RegexLexer) that matches the whole source code against one compiled regular expression
+and finds the lines of tokens through the line offsets of the SourceBuffer, instead of
+calling back for every newline. The latter is used unless --ply-lexer is given; both
+produce the same tokens (see benchmarks/lexer.py).
+
 ======================================================================================
 --------------------------------------------------------------------------------------
 '''
-import sys
+import os
+import re
+import itertools
+import threading
+import importlib.util
 import ply.lex as lex
+import asincache
 from asinerrs import *
 
 reserved = {
@@ -86,7 +97,8 @@ t_COMMA = r','
 t_COLON = r':'
 t_SMCOLON = r';'
 
-t_ignore_WS = r'\s+'
+# newlines are left to t_NEWLINE, which counts them
+t_ignore_WS = r'[^\S\n]+'
 t_ignore_COMMENTS = r'[#].+'
 
 
@@ -99,16 +111,9 @@ def t_NEWLINE(t):
 def t_ID(t):
     r'[_a-zA-Z][_a-zA-Z0-9]*'
     t.type = reserved.get(t.value, 'ID')
-    return t
-
-def t_TRUE(t):
-    r'Totoo'
-    t.value = True
-    return t
-
-def t_FALSE(t):
-    r'Huwad'
-    t.value = False
+    if t.type == 'TRUE' or t.type == 'FALSE':
+        # Totoo and Huwad are reserved words, so they are matched here as well
+        t.value = t.type == 'TRUE'
     return t
 
 def t_FLOAT(t):
@@ -123,6 +128,8 @@ def t_INTEGER(t):
 
 def t_STRING(t):
     r'"([\\.]|[^"\\])*"'
+    # a string may span lines, which are counted for the tokens after it
+    t.lexer.lineno += t.value.count('\n')
     t.value = t.value.lstrip('"')
     t.value = t.value.rstrip('"')
     return t
@@ -131,14 +138,221 @@ def t_error(t):
     '''
     Raise a lexical error upon encountering an unrecognized lexeme/token
     '''
-    line = open(sys.argv[1]).readlines()[t.lineno - 1]
-    raise MaalatNaLeksim(t.lineno, findColumn(sys.argv[1], t), t.value, line)
+    source = sourceOf(t.lexer)
+    raise MaalatNaLeksim(t.lineno, findColumn(source, t), t.value[0], source.line(t.lineno))
 
-def findColumn(input,lexeme):
+def findColumn(source, lexeme):
     '''
     Function for computing the position of a lexeme within
-    a line of code, as specified in the ply documentation
+    its line of code, counted from 1
+    '''
+    return source.column(lexeme.lineno, lexeme.lexpos)
+
+class SourceBuffer:
+    '''
+    The source code of a program along with the name it was read from. Lines and
+    columns are found through the offsets at which the lines begin, computed once
+    '''
+    def __init__(self, text, filename='<asin>'):
+        self.text = text
+        self.filename = filename
+        self.offsets = list(itertools.accumulate((len(line) + 1 for line in text.split('\n')), initial=0))
+
+    def line(self, lineno):
+        '''
+        Returns the text of a line (counted from 1), without its line break
+        '''
+        return self.text[self.offsets[lineno - 1]:self.offsets[lineno] - 1].rstrip('\r')
+
+    def column(self, lineno, position):
+        '''
+        Returns the column (counted from 1) of a position in the source code within its line
+        '''
+        return position - self.offsets[lineno - 1] + 1
+
+def sourceOf(lexer):
+    '''
+    Returns the SourceBuffer of the source code being lexed; one is made
+    if the lexer was handed source code without it
+    '''
+    if lexer.source is None or lexer.source.text is not lexer.lexdata:
+        lexer.source = SourceBuffer(lexer.lexdata)
+    return lexer.source
+
+def buildLexer(kind='regex'):
+    '''
+    Builds the lexer of the given kind, 'regex' (RegexLexer) or 'ply'; the SourceBuffer
+    of the source code it is handed is kept as lexer.source, for reporting errors
+    '''
+    if kind == 'regex':
+        return RegexLexer()
+    lexer = lexerFromCache()
+    lexer.source = None
+    return lexer
+
+def lexTableName():
+    '''
+    Returns the name of the lexing table (lextab) generated for the current tokens;
+    it is stored in the cache as <name>.py
+    '''
+    return 'asinlextab_' + asincache.grammarDigest(globals(), 't_', tokens, reserved)
+
+def lexerFromCache():
+    '''
+    Builds the lexer through lex.lex() in optimized mode. The lexing table (lextab) is
+    read from the cache (see asincache.py) when it was generated for the same tokens
+    before; otherwise it is generated and written there for the next runs
     '''
-    return (lexeme.lexpos - lexeme.lineno) + 1
+    name = lexTableName()
+    path = asincache.tablePath(name + '.py')
+    if os.path.exists(path):
+        try:
+            spec = importlib.util.spec_from_file_location(name, path)
+            lextab = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(lextab)
+            return lex.lex(optimize=1, lextab=lextab, errorlog=lex.NullLogger())
+        except Exception:
+            # an unreadable table is generated again
+            pass
 
-lexer = lex.lex()
\ No newline at end of file
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        # the cache cannot be created; the table is not written anywhere
+        return lex.lex(errorlog=lex.NullLogger())
+
+    # the table is written under a temporary name, then moved to its path, so
+    # that concurrent runs (in other processes, or other threads of the same one)
+    # never read a partially written table, nor write into the same one
+    temporaryName = '{}_{}_{}'.format(name, os.getpid(), threading.get_ident())
+    lexer = lex.lex(optimize=1, lextab=temporaryName, outputdir=directory, errorlog=lex.NullLogger())
+    try:
+        os.replace(os.path.join(directory, temporaryName + '.py'), path)
+        asincache.removeStaleTables(path)
+    except OSError:
+        pass
+    return lexer
+
+# ====================================================================================
+#                              ~: Single-pass lexer :~
+# ====================================================================================
+
+def unescape(pattern):
+    '''
+    Returns the text matched by the regular expression of an operator, e.g. '**' for r'\*\*'
+    '''
+    return re.sub(r'\\(.)', r'\1', pattern)
+
+# the text of every operator and symbol, mapped to its token type, e.g. '**=': 'EXPEQUALS'
+OPERATORS = {unescape(pattern): name[2:] for name, pattern in list(globals().items())
+             if name.startswith('t_') and not name.startswith('t_ignore_') and isinstance(pattern, str)}
+
+# The rules of the functions above, in the order PLY tries them; operators are tried
+# longest first, as PLY does by sorting its string rules. Whitespace and comments
+# (including newlines, whose lines are found through the line offsets) are skipped
+MASTER = re.compile('|'.join('(?P<{}>{})'.format(name, pattern) for name, pattern in [
+    ('WS', r'\s+'),
+    ('ID', t_ID.__doc__),
+    ('FLOAT', t_FLOAT.__doc__),
+    ('INTEGER', t_INTEGER.__doc__),
+    ('STRING', r'"(?:[\\.]|[^"\\])*"'),
+    ('OPERATOR', '|'.join(re.escape(text) for text in sorted(OPERATORS, key=len, reverse=True))),
+    ('COMMENT', t_ignore_COMMENTS),
+]))
+
+class Token:
+    '''
+    A token handed to the parser, as PLY's LexToken
+    '''
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+    def __repr__(self):
+        return 'Token({}, {!r}, {}, {})'.format(self.type, self.value, self.lineno, self.lexpos)
+
+class RegexLexer:
+    '''
+    Lexes the whole source code in a single pass of MASTER over it, as a
+    generator of tokens. It is used as PLY's lexer is, through input() and token()
+    (or by iterating over it), and lexes the same tokens
+    '''
+    def __init__(self):
+        self.source = None
+        self.lexdata = ''
+        self.lineno = 1
+        self.tokens = iter(())
+
+    def input(self, text):
+        self.lexdata = text
+        self.tokens = self.tokenize()
+
+    def token(self):
+        return next(self.tokens, None)
+
+    def __iter__(self):
+        return self.tokens
+
+    def tokenize(self):
+        '''
+        Generates the tokens of the source code. Lines are counted from lexer.lineno
+        as it is when the first token is asked for
+        '''
+        text = self.lexdata
+        offsets = sourceOf(self).offsets
+        # lines are counted from the first, in the offsets
+        line = 1
+        nextLine = offsets[1]
+        firstLine = self.lineno - 1
+        keywords = reserved
+        operators = OPERATORS
+        position = 0
+        for match in MASTER.finditer(text):
+            start = match.start()
+            if start != position:
+                break
+            position = match.end()
+            kind = match.lastgroup
+            if kind == 'WS' or kind == 'COMMENT':
+                continue
+            while start >= nextLine:
+                line += 1
+                nextLine = offsets[line]
+            value = match.group()
+            if kind == 'OPERATOR':
+                kind = operators[value]
+            elif kind == 'ID':
+                kind = keywords.get(value, 'ID')
+                if kind == 'TRUE' or kind == 'FALSE':
+                    value = kind == 'TRUE'
+            elif kind == 'INTEGER':
+                value = int(value)
+            elif kind == 'FLOAT':
+                value = float(value)
+            elif kind == 'STRING':
+                value = value.lstrip('"').rstrip('"')
+            yield Token(kind, value, firstLine + line, start)
+
+        if position < len(text):
+            # the character at which no rule matched
+            while position >= nextLine:
+                line += 1
+                nextLine = offsets[line]
+            source = self.source
+            raise MaalatNaLeksim(firstLine + line, source.column(line, position), text[position], source.line(line))
+
+class TokenStream:
+    '''
+    Hands tokens that were lexed beforehand (by the given lexer) over to the
+    parser, in place of a lexer (e.g. to time lexing apart from parsing)
+    '''
+    def __init__(self, tokens, lexer):
+        self.tokens = iter(tokens)
+        # errors are reported with the lexer's source code
+        self.source = lexer.source
+        self.lexdata = lexer.lexdata
+    def token(self):
+        return next(self.tokens, None)
\ No newline at end of file
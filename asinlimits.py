@@ -0,0 +1,96 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the limits that may be set on a run of an Asin program, for running
+programs that are not trusted to end (e.g. a 'hanggat (Totoo)' without 'lumisan'):
+
+    steps   - how many times, in all, the program's loops may go around
+    seconds - how long the program may run, from when the run started
+    memory  - how many bytes an array may take up as idagdag() grows it
+    hook    - a function called with each statement (the node) before it runs
+
+Going past a limit raises one of the MaalatNaHangganan errors (see asinerrs.py). The
+limits are counted only where a program can run on indefinitely, at the end of every
+turn of a loop: the resolver adds a LimitCheck to the body of every loop (see
+'asinresolver.py'), and the transpiler calls it at the same place. The clock is only
+read once every CHECK_INTERVAL turns, so that the limits may stay on in production;
+programs run without limits have no checks at all.
+
+    Interpreter(limits=Limits(steps=10**6, seconds=2.0)).run(sourceCode)
+
+Statement hooks are called by walking the tree and by the closures, but not by the
+Python bytecode of --compile, which has no statements to pass to the hook.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import sys
+import time
+import asintable
+from asinerrs import *
+
+# turns of loops between readings of the clock
+CHECK_INTERVAL = 256
+
+class Limits:
+    '''
+    The limits and the statement hook of a run; each is None when not set. Every
+    run (see Interpreter.run) starts counting anew, so limits are not to be shared
+    by interpreters running at the same time
+    '''
+    def __init__(self, steps=None, seconds=None, memory=None, hook=None):
+        self.steps = steps
+        self.seconds = seconds
+        self.memory = memory
+        self.hook = hook
+        self.start()
+
+    def renewed(self):
+        '''
+        Returns new limits with the same settings, e.g. for another interpreter
+        '''
+        return Limits(self.steps, self.seconds, self.memory, self.hook)
+
+    def start(self):
+        '''
+        Starts counting the steps and the time of a run
+        '''
+        self.taken = 0
+        self.deadline = None if self.seconds is None else time.monotonic() + self.seconds
+        self.interval = self.left = self.nextInterval()
+
+    def nextInterval(self):
+        '''
+        Returns how many turns of loops go by until the limits are checked; the check
+        is done early enough to catch the first turn past the step limit
+        '''
+        if self.steps is None:
+            return CHECK_INTERVAL
+        return max(1, min(CHECK_INTERVAL, self.steps + 1 - self.taken))
+
+    def tick(self):
+        '''
+        Counts a turn of a loop; the limits are checked once in a while
+        '''
+        self.left -= 1
+        if self.left <= 0:
+            self.check()
+
+    def check(self):
+        self.taken += self.interval
+        if self.steps is not None and self.taken > self.steps:
+            raise MaalatNaLabisNaHakbang(self.steps)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise MaalatNaLabisNaOras(self.seconds)
+        self.interval = self.left = self.nextInterval()
+
+    def idagdag(self, array: list, value):
+        '''
+        Asin function for appending values to an array, within the memory limit
+        '''
+        asintable.idagdag(array, value)
+        size = sys.getsizeof(array)
+        if size > self.memory:
+            array.pop()
+            raise MaalatNaLabisNaMemorya(size, self.memory)
@@ -8,18 +8,92 @@ documentation of this file, please check along with the docstrings in 'asinhelpe
 ======================================================================================
 --------------------------------------------------------------------------------------
 '''
-import asintable
+import io
+import mmap
+import operator
+from asintable import UNBOUND
 from asinerrs import *
 from asinhelper import *
 
-# Getting the (pseudo-)hash table (in the form of a list two dictionaries)
-Table = asintable.HashTable()
-asintable.kargahan(Table)
+# Binary operators of Asin mapped to the Python functions that perform them
+BINOPS = {
+    # Arithmetic
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '//': operator.floordiv,
+    '**': operator.pow,
+    '%': operator.mod,
+    # Comparison
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    # Logical (both operands are always evaluated beforehand)
+    'at': lambda left, right: left and right,
+    'o': lambda left, right: left or right,
+}
 
-def pinchAll(expression):
-    while isinstance(expression, Grain):
-        expression = expression.pinch()
-    return expression
+# Compound assignment operators mapped to their binary counterparts
+COMPOPS = {
+    '+=': '+',
+    '-=': '-',
+    '*=': '*',
+    '/=': '/',
+    '//=': '//',
+    '**=': '**',
+    '%=': '%',
+}
+
+def walkGrains(root):
+    '''
+    Yields every node of the tree below (and including) root; the tree is walked with
+    an explicit stack, so that passes over deeply nested trees do not recurse. Only
+    the attributes named in each node's CHILDREN are walked, never the values bound
+    to it by the resolver (e.g. the hash table's list of values)
+    '''
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(reversed(node))
+        elif isinstance(node, (Grain, SaltBlock, ExprList)):
+            yield node
+            stack.extend(reversed([getattr(node, name) for name in node.CHILDREN]))
+
+def elementsOf(iterable):
+    '''
+    Returns what a for-each loop goes over: the elements of an array or a string,
+    or the lines of a file (without their line breaks), read as they are needed
+    '''
+    if isinstance(iterable, io.IOBase):
+        if iterable.closed or not iterable.readable():
+            raise MaalatNaFile(getattr(iterable, 'name', iterable), 'read',
+                               'it is closed' if iterable.closed else 'it was opened for writing')
+        if isinstance(iterable, io.TextIOBase):
+            return map(operator.methodcaller('rstrip', '\n'), iterable)
+        # a file opened for binary access is read as text, as a mapped file is
+        return (line.decode().rstrip('\n') for line in iterable)
+    elif isinstance(iterable, mmap.mmap):
+        # a file mapped into memory (see buksan) is also gone over by line
+        return (line.decode().rstrip('\n') for line in iter(iterable.readline, b''))
+    return iterable
+
+def indexFailure(arrId, elemPos):
+    '''
+    Returns the error to be raised when indexing arrId at elemPos failed
+    '''
+    if elemPos.__class__ is not int:
+        return MaalatNaIndeks(elemPos.__class__.__name__, elemPos)
+    # values other than arrays and strings raise their TypeError here
+    len(arrId)
+    if isinstance(arrId, mmap.mmap):
+        # the contents of a mapped file are not reported, only its size
+        return MaalatNaIndeks(elemPos, 'a mapped file of {} bytes'.format(len(arrId)), 0, len(arrId) - 1)
+    return MaalatNaIndeks(elemPos, arrId, 0, len(arrId) - 1)
 
 # ====================================================================================
 #                              ~: AST Node definitions :~
@@ -27,9 +101,10 @@ def pinchAll(expression):
 
 class SaltBlock:
     '''
-    SaltBlock represents a block of code, a clause, or comma-separated expressions.
+    SaltBlock represents a block of code or a clause.
     We called it SaltBlock, as many grains (class Grain) clumped together make a block of salt
     '''
+    CHILDREN = ('grains',)
     def __init__(self, grains=None):
         '''
         The list "grains" represents the children nodes of the SaltBlock object
@@ -48,19 +123,39 @@ class SaltBlock:
         '''
         return iter(self.grains)
     def pinch(self):
+        # a 'lumisan' within the block raises LoopExit (see ExitStmt), which leaves it
+        for grain in self.grains:
+            grain.pinch()
+
+class ExprList:
+    '''
+    ExprList represents comma-separated expressions, e.g. the values to be
+    printed, the entries of an array, or the arguments of a function call
+    '''
+    CHILDREN = ('grains',)
+    def __init__(self, grains=None):
+        if grains is None:
+            grains = []
+        self.grains = grains
+    def __len__(self):
+        return len(self.grains)
+    def __iter__(self):
+        return iter(self.grains)
+    def pinch(self):
+        # values that are None (e.g. of functions that return nothing) are left out
         toReturn = []
-        for i in self:
-            if isinstance(i, ExitStmt):
-                # returns an ExitStmt instance that will trigger a 'break'
-                return i
-            result = i.pinch()
-            if isinstance(result, ExitStmt):
-                # returns an ExitStmt instance that will trigger a 'break'
-                return result
-            elif result is not None:
+        for grain in self.grains:
+            result = grain.pinch()
+            if result is not None:
                 toReturn.append(result)
         return toReturn
 
+class LoopExit(Exception):
+    '''
+    LoopExit is raised by a 'lumisan' (see ExitStmt) and caught by the loop it
+    leaves; an exit outside of any loop only ends the top-level statement it is in
+    '''
+
 class Primitive(Grain):
     '''
     Primitive is a class for primitive values (integer, float, string, true, false)
@@ -79,27 +174,36 @@ class Identifier(Grain):
     isfunc = False
     def __init__(self, identifier):
         self.identifier = identifier
+        # the variable's slot in the list of values of the hash table,
+        # both set by the resolver (see asinresolver.py) before running
+        self.slot = None
+        self.values = None
     def bindToValue(self, value):
         '''
-        Adds an entry to the hash table attaching a value to the identifier
+        Stores the value in the identifier's slot in the hash table
         '''
-        Table.setVar(self.identifier, value)
+        self.values[self.slot] = value
     def selfDestruct(self):
         '''
-        Deletes the entry that has key=identifier from the hash table
+        Unbinds the identifier's slot in the hash table
         '''
-        Table.delVar(self.identifier)
+        if self.values[self.slot] is UNBOUND:
+            raise KeyError(self.identifier)
+        self.values[self.slot] = UNBOUND
     def pinch(self):
-        if not self.isfunc:
-            return Table.getVar(self.identifier)
-        else:
-            return Table.getFunc(self.identifier)
+        # identifiers of functions are never pinched; calls are bound to
+        # their functions by the resolver (see AsinFunctionCall.bindFunction)
+        value = self.values[self.slot]
+        if value is UNBOUND:
+            raise MaalatNaSimbolo(self.identifier)
+        return value
 
 class Array(Grain):
     '''
     Array trivially represents an an array/list similar to Python's
     '''
-    def __init__(self, entries: SaltBlock = None):
+    CHILDREN = ('entries',)
+    def __init__(self, entries: ExprList = None):
         self.entries = entries
     def pinch(self):
         if self.entries is not None:
@@ -111,6 +215,7 @@ class BinOp(Grain):
     '''
     BinOp is an expression class representative of binary operations
     '''
+    CHILDREN = ('left', 'right')
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
@@ -120,41 +225,7 @@ class BinOp(Grain):
         right = self.right.pinch()
 
         try:
-            # Arithmetic
-            if self.op == '+':
-                returnValue = left + right
-            elif self.op == '-':
-                returnValue = left - right
-            elif self.op == '*':
-                returnValue = left * right
-            elif self.op == '/':
-                returnValue = left / right
-            elif self.op == '//':
-                returnValue = left // right
-            elif self.op == '**':
-                returnValue = left ** right
-            elif self.op == '%':
-                returnValue = left % right
-            # Comparison
-            elif self.op == '==':
-                returnValue = left == right
-            elif self.op == '!=':
-                returnValue = left != right
-            elif self.op == '>':
-                returnValue = left > right
-            elif self.op == '>=':
-                returnValue = left >= right
-            elif self.op == '<':
-                returnValue = left < right
-            elif self.op == '<=':
-                returnValue = left <= right
-            # Logical
-            elif self.op == 'at':
-                returnValue = left and right
-            elif self.op == 'o':
-                returnValue = left or right
-            return returnValue
-
+            return BINOPS[self.op](left, right)
         except TypeError:
             # raise an error when the operation on two operands doesn't work
             raise MaalatNaOperasyon(left, self.op, right, left.__class__.__name__, self.op, right.__class__.__name__)
@@ -162,11 +233,36 @@ class BinOp(Grain):
             # raise an error when dividing an numerical expression by 0
             raise MaalatNaAritmetika(left.__class__.__name__, left)
 
+class OpChain(Grain):
+    '''
+    OpChain is a long chain of binary operations done from left to right, e.g.
+    "a + b - c + ...", made by the optimizer out of BinOps nested within each other's
+    left operand (see asinoptimizer.py); it is evaluated in a loop, instead of with a
+    pinch() within another for every operation
+    '''
+    CHILDREN = ('first', 'steps')
+    def __init__(self, first, steps):
+        self.first = first
+        # (operator, right operand) of every operation, in the order they are done
+        self.steps = steps
+    def pinch(self):
+        left = self.first.pinch()
+        for op, operand in self.steps:
+            right = operand.pinch()
+            try:
+                left = BINOPS[op](left, right)
+            except TypeError:
+                raise MaalatNaOperasyon(left, op, right, left.__class__.__name__, op, right.__class__.__name__)
+            except ArithmeticError:
+                raise MaalatNaAritmetika(left.__class__.__name__, left)
+        return left
+
 class UnaOp(Grain):
     '''
     UnaOp is a class that handles the 'not' and '-' operators for
     singular expressions (i.e. of the form [operator][expression])
     '''
+    CHILDREN = ('expression',)
     def __init__(self, op, expression):
         self.op = op
         self.expression = expression
@@ -184,6 +280,7 @@ class AssignStmt(Grain):
     '''
     AssignStmt is instantiated when a value is being assigned to a variable
     '''
+    CHILDREN = ('ident', 'value')
     def __init__(self, ident: Identifier, value):
         self.ident = ident
         self.value = value
@@ -194,6 +291,7 @@ class CompAssignStmt(Grain):
     '''
     CompAssignStmt is instantiated when a compund assignment operation is being performed
     '''
+    CHILDREN = ('ident', 'value')
     def __init__(self, ident: Identifier, op, value):
         self.ident = ident
         self.op = op
@@ -238,38 +336,72 @@ class CompAssignStmt(Grain):
 
 class IfStmt(Grain):
     '''
-    IfStmt is instantiated when an if-conditional statement is processed
+    IfStmt is instantiated when an if-conditional statement is processed; the if clause
+    and every else-if clause chained to it are its branches, a list of (condition,
+    SaltBlock) pairs tried in order, and elseSeg is the block of its else clause (if any)
     '''
-    def __init__(self, condition, ifSeg: SaltBlock, elseSeg = None):
-        self.condition = condition
-        self.ifSeg = ifSeg
+    CHILDREN = ('branches', 'elseSeg')
+    def __init__(self, branches, elseSeg: SaltBlock = None):
+        self.branches = branches
+        self.elseSeg = elseSeg
+    def pinch(self):
+        # only the block of the first branch whose condition holds is run
+        for condition, block in self.branches:
+            if condition.pinch():
+                block.pinch()
+                return
+        if self.elseSeg is not None:
+            self.elseSeg.pinch()
+
+class SwitchStmt(Grain):
+    '''
+    SwitchStmt is made by the optimizer (see asinoptimizer.py) in place of an IfStmt
+    whose branches each compare the same expression to a constant, e.g. "kapag (x == 1)
+    ... ngunit kapag (x == 2) ..."; the expression is evaluated once, and the block to
+    run is looked up by its value in a dictionary of the constants
+    '''
+    CHILDREN = ('subject', 'blocks', 'elseSeg')
+    def __init__(self, subject, cases: dict, blocks, elseSeg: SaltBlock = None):
+        self.subject = subject
+        # each constant mapped to the position of its block within blocks
+        self.cases = cases
+        self.blocks = blocks
         self.elseSeg = elseSeg
     def pinch(self):
-        if self.condition.pinch():
-            return self.ifSeg.pinch()
+        value = self.subject.pinch()
+        try:
+            position = self.cases.get(value)
+        except TypeError:
+            # values that cannot be looked up (arrays) are equal to none of the constants
+            position = None
+        if position is not None:
+            self.blocks[position].pinch()
         elif self.elseSeg is not None:
-            return self.elseSeg.pinch()
+            self.elseSeg.pinch()
 
 class WhileStmt(Grain):
     '''
     WhileStmt is instantiated when a while-statement is encountered;
     a SaltBlock object as the loop body is run as long as the condition holds true
     '''
+    CHILDREN = ('condition', 'loopBody')
     def __init__(self, condition, loopBody: SaltBlock):
         self.condition = condition
         self.loopBody = loopBody
     def pinch(self):
-        while self.condition.pinch():
-            loopBodyRes = self.loopBody.pinch()
-            if isinstance(loopBodyRes, ExitStmt):
-                break
-                
+        try:
+            while self.condition.pinch():
+                self.loopBody.pinch()
+        except LoopExit:
+            pass
+
 class ForStmt(Grain):
     '''
     ForStmt is instantiated when the interpreter reads a for-loop clause;
     the loop body (a SaltBlock object) will be run from <start> to <end>
     '''
 
+    CHILDREN = ('iterator', 'start', 'end', 'loopBody')
     def __init__(self, iterator: Identifier, start, end, loopBody: SaltBlock):
         self.iterator = iterator
         self.start = start
@@ -278,23 +410,47 @@ class ForStmt(Grain):
     def pinch(self):
         begin = self.start.pinch()
         finish = self.end.pinch() + 1
-        for count in range(begin, finish):
-            self.iterator.bindToValue(count)
-            loopBodyRes = self.loopBody.pinch()
-            if isinstance(loopBodyRes, ExitStmt):
-                break
+        try:
+            for count in range(begin, finish):
+                self.iterator.bindToValue(count)
+                self.loopBody.pinch()
+        except LoopExit:
+            pass
         self.iterator.selfDestruct()
 
+class ForEachStmt(Grain):
+    '''
+    ForEachStmt is instantiated when the interpreter reads a for-each clause;
+    the loop body (a SaltBlock object) is run for every element of an array or
+    string, or for every line of a file, read as the loop goes
+    '''
+    CHILDREN = ('iterator', 'iterable', 'loopBody')
+    def __init__(self, iterator: Identifier, iterable, loopBody: SaltBlock):
+        self.iterator = iterator
+        self.iterable = iterable
+        self.loopBody = loopBody
+    def pinch(self):
+        try:
+            for element in elementsOf(self.iterable.pinch()):
+                self.iterator.bindToValue(element)
+                self.loopBody.pinch()
+        except LoopExit:
+            pass
+        # unlike in ForStmt, an iterator that was never bound is left as it is
+        self.iterator.values[self.iterator.slot] = UNBOUND
 
 class PrintStmt(Grain):
     '''
     PrintStmt handles the printing pseudo-function of Asin
     '''
-    def __init__(self, toPrint: SaltBlock):
+    CHILDREN = ('toPrint',)
+    def __init__(self, toPrint: ExprList):
         self.toPrint = toPrint
+        # the stream printed to, bound by the resolver; None prints to sys.stdout
+        self.stdout = None
     def pinch(self):
         toPrintList = self.toPrint.pinch()
-        print(*toPrintList)
+        print(*toPrintList, file=self.stdout)
 
 class ExitStmt(Grain):
     '''
@@ -303,26 +459,51 @@ class ExitStmt(Grain):
     def __iter__(self):
         return []
     def pinch(self):
-        pass
+        raise LoopExit
 
 class ArrAccess(Grain):
     '''
-    ArrAccess represents an instruction to access an array at a certain index
+    ArrAccess represents an instruction to access an array at a certain index; the
+    array may itself be any expression, e.g. another ArrAccess as in a[i][j]
     '''
-    def __init__(self, arrName: Identifier, index):
+    CHILDREN = ('arrName', 'index')
+    def __init__(self, arrName, index):
         self.arrName = arrName
         self.index = index
     def pinch(self):
         arrId = self.arrName.pinch()
         elemPos = self.index.pinch()
-        if elemPos.__class__.__name__ != 'int':
-            # raise TypeError
-            raise MaalatNaIndeks(elemPos.__class__.__name__, elemPos)
-        elif elemPos >= len(arrId) or elemPos < -len(arrId):
-            # raise IndexError
-            raise MaalatNaIndeks(elemPos, arrId, 0, len(arrId) - 1)
-        else:
-            return self.arrName.pinch()[elemPos]
+        # booleans are not accepted as indices, even though bool is a subclass of int
+        if elemPos.__class__ is int:
+            try:
+                return arrId[elemPos]
+            except (IndexError, TypeError):
+                pass
+        raise indexFailure(arrId, elemPos)
+
+class LimitCheck(Grain):
+    '''
+    LimitCheck is placed by the resolver at the end of every loop body when the run
+    has limits (see asinlimits.py), to count each turn of the loop against them
+    '''
+    def __init__(self, limits):
+        self.limits = limits
+        # counting is all there is to it, so Limits.tick() is called directly
+        self.pinch = limits.tick
+
+class HookedStmt(Grain):
+    '''
+    HookedStmt is placed by the resolver in place of every statement when the run
+    has a statement hook (see asinlimits.py), which is called before the statement runs
+    '''
+    CHILDREN = ('statement',)
+    def __init__(self, statement, hook):
+        self.statement = statement
+        self.hook = hook
+        self.lineno = statement.lineno
+    def pinch(self):
+        self.hook(self.statement)
+        return self.statement.pinch()
 
 class AsinFunctionCall(Grain):
     '''
@@ -330,17 +511,30 @@ class AsinFunctionCall(Grain):
     (as per the grammar) is encountered. Please refer to class AsinFunction
     for additional information
     '''
-    def __init__(self, funcName: Identifier, arguments: SaltBlock = None):
+    CHILDREN = ('funcName', 'arguments')
+    def __init__(self, funcName: Identifier, arguments: ExprList = None):
         self.funcName = funcName
         self.arguments = arguments
+        # the native Python function called, bound by the resolver
+        self.function = None
+    def bindFunction(self, function: AsinFunction):
+        '''
+        Binds the call to the function once, before running. Calls with up to three
+        arguments get a pinch() that passes them without building a list of arguments
+        '''
+        self.function = function.funcName
+        argc = len(self.arguments) if self.arguments is not None else 0
+        if argc <= 3:
+            self.pinch = (self.pinch0, self.pinch1, self.pinch2, self.pinch3)[argc]
+    def pinch0(self):
+        return self.function()
+    def pinch1(self):
+        return self.function(self.arguments.grains[0].pinch())
+    def pinch2(self):
+        args = self.arguments.grains
+        return self.function(args[0].pinch(), args[1].pinch())
+    def pinch3(self):
+        args = self.arguments.grains
+        return self.function(args[0].pinch(), args[1].pinch(), args[2].pinch())
     def pinch(self):
-        function = self.funcName.pinch()
-        argList = []
-
-        if self.arguments is not None:
-            for arg in self.arguments:
-                argList.append(pinchAll(arg))
-
-        # returns a Python function in the dictionary, encapsulated
-        # by AsinFunction which has a defined pinch() function
-        return function.pinch(argList)
\ No newline at end of file
+        return self.function(*[arg.pinch() for arg in self.arguments.grains])
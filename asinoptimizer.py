@@ -0,0 +1,338 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the optimizer of Asin, a pass over the abstract syntax tree that
+runs between parsing and running a program. Operations whose operands are all known
+beforehand (e.g. "2 * 3 + 1", "hindi Huwad") are folded into a single Primitive, and
+'kapag' and 'hanggat' statements whose conditions are constant are replaced by the
+clause that would run (if any). Long chains of operations (e.g. "a + b + c + ...") are
+flattened into an OpChain, which is evaluated in a loop rather than by recursing, and
+chains of 'ngunit kapag' comparing the same expression to constants (e.g. "kapag (x == 1)
+... ngunit kapag (x == 2) ...") become a SwitchStmt, which looks up the branch to take.
+
+An operation is only folded when evaluating it succeeds; e.g. "1 / 0" is left as it is,
+so that the error is still raised, with the same message, when the program runs.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+from asinnodes import *
+
+# Folded values are kept small, as they are built before the program runs;
+# larger ones (e.g. "2 ** 100000", "'abc' * 100000") are left to be computed at runtime
+MAX_FOLDED_BITS = 4096
+MAX_FOLDED_LENGTH = 4096
+
+# chains of at least this many operations, each the left operand of the next, are
+# flattened into an OpChain; shorter ones are left as BinOps, which are quicker to run
+CHAIN_LENGTH = 16
+
+# nodes that a switch may compare: evaluating them has no side effects, so evaluating
+# the expression once gives what it would have for every branch tried
+PURE_NODES = (Primitive, Identifier, BinOp, OpChain, UnaOp, ArrAccess)
+
+def optimize(program: SaltBlock):
+    '''
+    Optimizes the SaltBlock returned by the parser (before it is resolved)
+    and returns it
+    '''
+    grains = []
+    for grain in program.grains:
+        grains.extend(optimizeStatement(grain, topLevel=True))
+    program.grains = grains
+    return program
+
+def optimizeGrain(grain):
+    '''
+    Optimizes a node of the abstract syntax tree through the optimizing
+    function registered for its class, and returns the node replacing it
+    '''
+    optimizer = OPTIMIZERS.get(grain.__class__)
+    if optimizer is None:
+        return grain
+    return optimizer(grain)
+
+def optimizeStatement(grain, topLevel=False):
+    '''
+    Optimizes a statement within a block and returns the list of statements
+    replacing it; the list is empty if the statement would never do anything
+    '''
+    if isinstance(grain, IfStmt):
+        lineno = grain.lineno
+        grain = optimizeIfStmt(grain)
+        if grain is None:
+            return []
+        elif isinstance(grain, SaltBlock):
+            if topLevel and hasStrayExit(grain):
+                # an exit outside of a loop ends only the top-level statement it is in,
+                # so the clause cannot be merged with the statements following it
+                kept = IfStmt([(Primitive(True), grain)])
+                kept.lineno = lineno
+                return [kept]
+            return grain.grains
+        return [grain]
+    elif isinstance(grain, WhileStmt):
+        grain.condition = optimizeGrain(grain.condition)
+        if isinstance(grain.condition, Primitive) and not grain.condition.value:
+            return []
+        grain.loopBody = optimizeBlock(grain.loopBody)
+        return [grain]
+    return [optimizeGrain(grain)]
+
+def optimizeBlock(block: SaltBlock):
+    grains = []
+    for grain in block:
+        grains.extend(optimizeStatement(grain))
+    block.grains = grains
+    return block
+
+def optimizeExprList(block: ExprList):
+    block.grains = [optimizeGrain(grain) for grain in block]
+    return block
+
+def hasStrayExit(block):
+    '''
+    Whether the block has a 'lumisan' that is not within one of its loops
+    '''
+    for grain in block:
+        if isinstance(grain, ExitStmt):
+            return True
+        elif isinstance(grain, IfStmt):
+            if any(hasStrayExit(block) for _, block in grain.branches) or hasStrayExit(grain.elseSeg or []):
+                return True
+        elif isinstance(grain, SwitchStmt):
+            if any(hasStrayExit(block) for block in grain.blocks) or hasStrayExit(grain.elseSeg or []):
+                return True
+    return False
+
+def folded(value, grain):
+    '''
+    Returns the Primitive that an operation is folded into, on the operation's line
+    '''
+    primitive = Primitive(value)
+    primitive.lineno = grain.lineno
+    return primitive
+
+def isFoldable(op, left, right):
+    '''
+    Whether the result of an operation on two constants is small enough to be folded
+    '''
+    if op == '**' and left.__class__ is int and right.__class__ is int:
+        return right <= 0 or left.bit_length() * right <= MAX_FOLDED_BITS
+    elif op == '*' and isinstance(left, str) and isinstance(right, int):
+        return len(left) * right <= MAX_FOLDED_LENGTH
+    elif op == '*' and isinstance(left, int) and isinstance(right, str):
+        return left * len(right) <= MAX_FOLDED_LENGTH
+    return True
+
+# ====================================================================================
+#                              ~: Expression optimizers :~
+# ====================================================================================
+
+def optimizeArray(grain: Array):
+    if grain.entries is not None:
+        grain.entries = optimizeExprList(grain.entries)
+    return grain
+
+def optimizeBinOp(grain: BinOp):
+    '''
+    Optimizes a binary operation along with the operations nested in its left operand
+    (e.g. all of "a + b + c"), which are gone through in a loop rather than by recursing,
+    and flattens what is left of the chain into an OpChain if it is long enough
+    '''
+    chain = []
+    while isinstance(grain, BinOp):
+        chain.append(grain)
+        grain = grain.left
+    left = optimizeGrain(grain)
+    # the operations are folded from the innermost (leftmost) one out
+    for grain in reversed(chain):
+        grain.left = left
+        grain.right = optimizeGrain(grain.right)
+        left = foldBinOp(grain)
+    return flattenChain(left)
+
+def foldBinOp(grain: BinOp):
+    '''
+    Returns what a binary operation with optimized operands is folded into,
+    or the operation itself
+    '''
+    if not isinstance(grain.left, Primitive):
+        return grain
+
+    left = grain.left.value
+    if isinstance(grain.right, Primitive):
+        right = grain.right.value
+        if not isFoldable(grain.op, left, right):
+            return grain
+        try:
+            return folded(BINOPS[grain.op](left, right), grain)
+        except Exception:
+            # the error is raised by BinOp.pinch() when the program runs
+            return grain
+    elif (grain.op == 'at' and left) or (grain.op == 'o' and not left):
+        # e.g. "Totoo at x" and "Huwad o x" both evaluate to x
+        return grain.right
+    return grain
+
+def flattenChain(grain):
+    '''
+    Returns an OpChain in place of a BinOp heading a chain of at least CHAIN_LENGTH
+    operations, each the left operand of the next; other nodes are returned as they are
+    '''
+    steps = []
+    first = grain
+    while isinstance(first, BinOp):
+        steps.append((first.op, first.right))
+        first = first.left
+    if len(steps) < CHAIN_LENGTH:
+        return grain
+    steps.reverse()
+    chain = OpChain(first, steps)
+    chain.lineno = grain.lineno
+    return chain
+
+def optimizeUnaOp(grain: UnaOp):
+    grain.expression = optimizeGrain(grain.expression)
+    if not isinstance(grain.expression, Primitive):
+        return grain
+
+    operand = grain.expression.value
+    if grain.op == 'hindi':
+        return folded(not operand, grain)
+    try:
+        return folded(-operand, grain)
+    except Exception:
+        # the error is raised by UnaOp.pinch() when the program runs
+        return grain
+
+def optimizeArrAccess(grain: ArrAccess):
+    grain.arrName = optimizeGrain(grain.arrName)
+    grain.index = optimizeGrain(grain.index)
+    return grain
+
+def optimizeFunctionCall(grain: AsinFunctionCall):
+    if grain.arguments is not None:
+        grain.arguments = optimizeExprList(grain.arguments)
+    return grain
+
+# ====================================================================================
+#                              ~: Statement optimizers :~
+# ====================================================================================
+
+def optimizeAssignStmt(grain: AssignStmt):
+    grain.value = optimizeGrain(grain.value)
+    return grain
+
+def optimizeCompAssignStmt(grain: CompAssignStmt):
+    grain.value = optimizeGrain(grain.value)
+    return grain
+
+def optimizeIfStmt(grain: IfStmt):
+    '''
+    Optimizes an if statement along with its else-ifs. Branches whose conditions are
+    constant are taken out: a false one is dropped, and a true one becomes the else
+    clause, in place of the branches after it. Returns the statement (or a SwitchStmt in
+    its place), or, if no branch is left, the clause that would run instead (a
+    SaltBlock, or None if none would)
+    '''
+    branches = []
+    elseSeg = grain.elseSeg
+    for condition, block in grain.branches:
+        condition = optimizeGrain(condition)
+        if not isinstance(condition, Primitive):
+            branches.append((condition, optimizeBlock(block)))
+        elif condition.value:
+            elseSeg = block
+            break
+    if elseSeg is not None:
+        elseSeg = optimizeBlock(elseSeg)
+
+    if not branches:
+        return elseSeg
+    grain.branches = branches
+    grain.elseSeg = elseSeg
+    return switchOf(grain)
+
+def switchOf(grain: IfStmt):
+    '''
+    Returns a SwitchStmt in place of an if statement with else-ifs whose conditions
+    each compare the same expression (without side effects) to a constant, or the
+    statement itself
+    '''
+    if len(grain.branches) < 2:
+        return grain
+    subject = subjectKey = None
+    cases = {}
+    blocks = []
+    for condition, block in grain.branches:
+        if not isinstance(condition, BinOp) or condition.op != '==':
+            return grain
+        elif isinstance(condition.right, Primitive):
+            expression, constant = condition.left, condition.right.value
+        elif isinstance(condition.left, Primitive):
+            expression, constant = condition.right, condition.left.value
+        else:
+            return grain
+        key = expressionKey(expression)
+        if key is None or (subject is not None and key != subjectKey):
+            return grain
+        if subject is None:
+            subject, subjectKey = expression, key
+        # a branch whose constant is equal to an earlier one's (e.g. 1 and 1.0) is never taken
+        if constant not in cases:
+            cases[constant] = len(blocks)
+            blocks.append(block)
+
+    switch = SwitchStmt(subject, cases, blocks, grain.elseSeg)
+    switch.lineno = grain.lineno
+    return switch
+
+def expressionKey(grain):
+    '''
+    Returns the nodes of an expression, as a tuple that is equal to that of another
+    expression if they are written the same; None if the expression may have side
+    effects (e.g. function calls)
+    '''
+    key = []
+    for node in walkGrains(grain):
+        if not isinstance(node, PURE_NODES):
+            return None
+        elif isinstance(node, Primitive):
+            key.append((Primitive, node.value.__class__, node.value))
+        elif isinstance(node, Identifier):
+            key.append((Identifier, node.identifier))
+        elif isinstance(node, OpChain):
+            key.append((OpChain,) + tuple(op for op, _ in node.steps))
+        else:
+            key.append((node.__class__, getattr(node, 'op', None)))
+    return tuple(key)
+
+def optimizeForStmt(grain: ForStmt):
+    grain.start = optimizeGrain(grain.start)
+    grain.end = optimizeGrain(grain.end)
+    grain.loopBody = optimizeBlock(grain.loopBody)
+    return grain
+
+def optimizeForEachStmt(grain: ForEachStmt):
+    grain.iterable = optimizeGrain(grain.iterable)
+    grain.loopBody = optimizeBlock(grain.loopBody)
+    return grain
+
+def optimizePrintStmt(grain: PrintStmt):
+    grain.toPrint = optimizeExprList(grain.toPrint)
+    return grain
+
+OPTIMIZERS = {
+    Array: optimizeArray,
+    BinOp: optimizeBinOp,
+    UnaOp: optimizeUnaOp,
+    ArrAccess: optimizeArrAccess,
+    AsinFunctionCall: optimizeFunctionCall,
+    AssignStmt: optimizeAssignStmt,
+    CompAssignStmt: optimizeCompAssignStmt,
+    ForStmt: optimizeForStmt,
+    ForEachStmt: optimizeForEachStmt,
+    PrintStmt: optimizePrintStmt,
+}
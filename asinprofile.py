@@ -0,0 +1,196 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the profiler of Asin, used with ./asin --profile <filename>. Every
+node of the program's tree is timed as it is evaluated: how many times it was, and the
+time spent in it, both in all (total) and apart from the nodes below it (self). A report
+of the nodes and the source lines where the most time was spent is printed on stderr
+when the program ends; with --profile=<file>, the measurements are also written to the
+file, as JSON if its name ends with .json and in the callgrind format otherwise (e.g.
+callgrind.out.asin, for KCachegrind and other callgrind viewers).
+
+Nodes are timed by replacing the pinch() of each one with a timing wrapper, on the
+node itself, before the program runs. Programs that are not profiled run the nodes'
+own pinch() and pay nothing for the profiler. The program is run by walking its tree,
+as the closures and the compiled code of the other backends have no nodes to time.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import sys
+import json
+import time
+from asinnodes import *
+
+# rows shown in each table of the report
+REPORTED_ROWS = 20
+
+class Profiler:
+    '''
+    Times the nodes of a program as it runs, and reports the measurements
+    '''
+    def __init__(self, sourceCode='', filename='<asin>'):
+        self.lines = sourceCode.split('\n')
+        self.filename = filename
+        # node: [times evaluated, self time, total time], in seconds
+        self.stats = {}
+        # (node, node evaluated within it): [times evaluated, total time]
+        self.calls = {}
+        # [time spent in the nodes evaluated within it, node] for each node being evaluated
+        self.stack = []
+
+    def instrument(self, grains):
+        '''
+        Times every node among the grains, with a wrapper in place of the node's pinch()
+        '''
+        for grain in grains:
+            if isinstance(grain, Grain) and grain not in self.stats:
+                grain.pinch = self.timed(grain, grain.pinch)
+
+    def timed(self, grain, pinch):
+        '''
+        Returns the wrapper that times pinch(), the evaluation of the node
+        '''
+        stats = self.stats[grain] = [0, 0.0, 0.0]
+        calls = self.calls
+        stack = self.stack
+        clock = time.perf_counter
+
+        def profiled(*args):
+            frame = [0.0, grain]
+            stack.append(frame)
+            began = clock()
+            try:
+                return pinch(*args)
+            finally:
+                elapsed = clock() - began
+                stack.pop()
+                stats[0] += 1
+                stats[1] += elapsed - frame[0]
+                stats[2] += elapsed
+                if stack:
+                    parent = stack[-1]
+                    parent[0] += elapsed
+                    call = calls.get((parent[1], grain))
+                    if call is None:
+                        call = calls[(parent[1], grain)] = [0, 0.0]
+                    call[0] += 1
+                    call[1] += elapsed
+        return profiled
+
+    def total(self):
+        '''
+        Returns the seconds spent evaluating the program's top-level statements
+        '''
+        called = {grain for _, grain in self.calls}
+        return sum(stats[2] for grain, stats in self.stats.items() if grain not in called)
+
+    def source(self, lineno):
+        '''
+        Returns the text of a line of the source code (counted from 1)
+        '''
+        if 0 < lineno <= len(self.lines):
+            return self.lines[lineno - 1].strip()
+        return ''
+
+    def report(self, stream=None):
+        '''
+        Prints the nodes, then the lines, on which the most time was spent
+        '''
+        stream = stream or sys.stderr
+        total = self.total()
+        evaluated = [(grain, stats) for grain, stats in self.stats.items() if stats[0]]
+        print('Asin profile of {}: {:.2f} ms, {} evaluations of {} nodes'.format(
+            self.filename, total * 1000, sum(stats[0] for _, stats in evaluated), len(evaluated)), file=stream)
+
+        print('\n{:>6}  {:<28} {:>10} {:>10} {:>10}'.format('line', 'node', 'calls', 'self ms', 'total ms'), file=stream)
+        evaluated.sort(key=lambda entry: entry[1][1], reverse=True)
+        for grain, (count, own, inclusive) in evaluated[:REPORTED_ROWS]:
+            print('{:>6}  {:<28} {:>10} {:>10.2f} {:>10.2f}'.format(
+                grain.lineno, describe(grain)[:28], count, own * 1000, inclusive * 1000), file=stream)
+
+        print('\n{:>6}  {:>10} {:>6}  {}'.format('line', 'self ms', '%', 'source'), file=stream)
+        for lineno, own in self.lineTimes()[:REPORTED_ROWS]:
+            share = own / total * 100 if total else 0
+            print('{:>6}  {:>10.2f} {:>6.1f}  {}'.format(lineno, own * 1000, share, self.source(lineno)), file=stream)
+
+    def lineTimes(self):
+        '''
+        Returns the self time spent on each source line, as (line, seconds), most first
+        '''
+        lines = {}
+        for grain, stats in self.stats.items():
+            lines[grain.lineno] = lines.get(grain.lineno, 0) + stats[1]
+        # nodes made by the optimizer may have no line (0)
+        return sorted(((lineno, own) for lineno, own in lines.items() if lineno and own), key=lambda entry: entry[1], reverse=True)
+
+    def dump(self, path):
+        '''
+        Writes the measurements into the file, as JSON if its name ends with .json
+        and in the callgrind format otherwise
+        '''
+        with open(path, 'w') as output:
+            if path.endswith('.json'):
+                json.dump(self.toJSON(), output, indent=1)
+            else:
+                output.write(self.toCallgrind())
+
+    def toJSON(self):
+        '''
+        Returns the measurements as JSON-serializable data; times are in seconds
+        '''
+        ids = {grain: number for number, grain in enumerate(self.stats)}
+        return {
+            'file': self.filename,
+            'total': self.total(),
+            'nodes': [{'id': ids[grain], 'node': describe(grain), 'line': grain.lineno,
+                       'calls': count, 'self': own, 'total': inclusive}
+                      for grain, (count, own, inclusive) in self.stats.items() if count],
+            'calls': [{'caller': ids[caller], 'callee': ids[callee], 'calls': count, 'total': inclusive}
+                      for (caller, callee), (count, inclusive) in self.calls.items()],
+            'lines': [{'line': lineno, 'self': own} for lineno, own in self.lineTimes()],
+        }
+
+    def toCallgrind(self):
+        '''
+        Returns the measurements in the callgrind format, with the nodes as functions
+        named after their kind and line (e.g. "BinOp (+):12"); times are in nanoseconds
+        '''
+        def name(grain):
+            return '{}:{}'.format(describe(grain), grain.lineno)
+
+        callees = {}
+        for (caller, callee), call in self.calls.items():
+            callees.setdefault(caller, []).append((callee, call))
+
+        lines = ['# callgrind format', 'version: 1', 'creator: asin', 'cmd: ' + self.filename,
+                 'positions: line', 'events: Nanoseconds',
+                 'summary: {}'.format(round(self.total() * 1e9)), '', 'fl=' + self.filename]
+        for grain, (count, own, inclusive) in self.stats.items():
+            if not count:
+                continue
+            lines.append('fn=' + name(grain))
+            lines.append('{} {}'.format(grain.lineno, round(own * 1e9)))
+            for callee, (calls, elapsed) in callees.get(grain, ()):
+                lines.append('cfn=' + name(callee))
+                lines.append('calls={} {}'.format(calls, callee.lineno))
+                lines.append('{} {}'.format(grain.lineno, round(elapsed * 1e9)))
+            lines.append('')
+        return '\n'.join(lines)
+
+def describe(grain):
+    '''
+    Returns the name a node is reported by: its class, with the operator,
+    variable or function it stands for (e.g. "BinOp (+)", "Identifier x")
+    '''
+    if isinstance(grain, (BinOp, UnaOp, CompAssignStmt)):
+        return '{} ({})'.format(grain.__class__.__name__, grain.op)
+    elif isinstance(grain, OpChain):
+        # the operators of the chain, each once, e.g. "OpChain (+, -)"
+        return 'OpChain ({})'.format(', '.join(dict.fromkeys(op for op, _ in grain.steps)))
+    elif isinstance(grain, Identifier):
+        return 'Identifier ' + grain.identifier
+    elif isinstance(grain, AsinFunctionCall):
+        return 'AsinFunctionCall ' + grain.funcName.identifier
+    return grain.__class__.__name__
@@ -0,0 +1,131 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the interactive mode of Asin, started with ./asin --repl. Statements
+are read one at a time and run right away; the variables they assign are kept in the
+hash table, so that later statements may use them.
+
+The lexer and the parser are built once (from the cached tables, see 'asincache.py'),
+in the background while the first statement is being typed, and are then given only
+the statement just entered. A statement spans more than one
+line while its parentheses, brackets or braces are left open, or while it does not
+yet end with ';' or '}'; a 'kapag' statement is ended by an empty line, as it may go
+on with 'ngunit' or 'kundiman'. The value of a function call entered on its own, if
+any, is printed.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import sys
+import threading
+from asinerrs import *
+
+PROMPT = 'asin> '
+CONTINUATION = '...   '
+
+# tokens that open and close a group, which must be balanced for a statement to end
+OPENING = ('LPAREN', 'LSQUARE', 'LCURLY')
+CLOSING = ('RPAREN', 'RSQUARE', 'RCURLY')
+
+def repl():
+    '''
+    Reads, runs and prints statements until the end of input (Ctrl-D)
+    '''
+    try:
+        # line editing and history, where available
+        import readline
+    except ImportError:
+        pass
+
+    # the prompt is shown at once, while the interpreter is loaded in the background
+    loaded = []
+    loader = threading.Thread(target=lambda: loaded.append(Session()), daemon=True)
+    loader.start()
+
+    print('Asin (interactive mode); press Ctrl-D to leave')
+    session = None
+    entered = ''
+    while True:
+        try:
+            line = input(CONTINUATION if entered else PROMPT)
+        except EOFError:
+            print()
+            if entered.strip() and session is not None:
+                # e.g. a 'kapag' statement that was not followed by an empty line
+                try:
+                    session.run(entered)
+                except Exception as alat:
+                    print(alat.__class__.__name__ + ' ' + str(alat), file=sys.stderr)
+            break
+        except KeyboardInterrupt:
+            # drops the statement being entered
+            print()
+            entered = ''
+            continue
+
+        entered += line + '\n'
+        if not entered.strip():
+            entered = ''
+            continue
+        try:
+            if session is None:
+                loader.join()
+                # if loading failed, it is done again here for its error to be reported
+                session = loaded[0] if loaded else Session()
+            if session.isComplete(entered, line):
+                statement, entered = entered, ''
+                session.run(statement)
+        except KeyboardInterrupt:
+            print('KeyboardInterrupt', file=sys.stderr)
+        except Exception as alat:
+            entered = ''
+            print(alat.__class__.__name__ + ' ' + str(alat), file=sys.stderr)
+
+class Session:
+    '''
+    Holds the interpreter (see asininterpreter.py) used throughout the
+    interactive session, along with its lexer and parser
+    '''
+    def __init__(self):
+        import asinnodes
+        from asininterpreter import Interpreter
+        self.asinnodes = asinnodes
+        # statements entered are not worth caching
+        self.interpreter = Interpreter(cached=False)
+        self.interpreter.build()
+        self.lexer = self.interpreter.lexer
+
+    def isComplete(self, entered, line):
+        '''
+        Whether the text entered so far makes up whole statements
+        '''
+        self.lexer.input(entered)
+        self.lexer.lineno = 1
+        depth = 0
+        first = last = None
+        for token in self.lexer:
+            if token.type in OPENING:
+                depth += 1
+            elif token.type in CLOSING:
+                depth -= 1
+            first = first or token.type
+            last = token.type
+        if depth > 0 or last not in ('SMCOLON', 'RCURLY'):
+            return False
+        # an if statement may still go on with an else clause
+        return first != 'IF' or last != 'RCURLY' or not line.strip()
+
+    def run(self, statement):
+        '''
+        Lexes, parses and runs the statements entered
+        '''
+        program = self.interpreter.resolve(self.interpreter.parse(statement, '<stdin>'))
+        for grain in program.grains:
+            try:
+                result = grain.pinch()
+            except self.asinnodes.LoopExit:
+                # an exit outside of a loop only ends the statement it is in
+                continue
+            if isinstance(grain, self.asinnodes.AsinFunctionCall) and result is not None:
+                print(result)
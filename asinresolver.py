@@ -0,0 +1,55 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the resolver of Asin, a pass over the parsed program done before
+running it. Every distinct variable name is given a fixed slot in the hash table's list
+of values, and each Identifier node is bound to that slot, so reading or assigning a
+variable is a single indexing instead of lookups through the table's dictionaries.
+
+As Asin has no user-defined functions, function calls are likewise bound to the
+built-in Python functions they call; calling an unknown function is reported here,
+before the program runs. Printing statements are bound to the table's output stream.
+
+A program is resolved against the hash table of the interpreter running it (see
+'asininterpreter.py'), so programs run by different interpreters share no variables.
+When the table has limits (see 'asinlimits.py'), a LimitCheck is added to the end of
+every loop body, and with a statement hook every statement is put in a HookedStmt.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+from asinnodes import *
+from asintable import HashTable
+
+def resolve(program: SaltBlock, table: HashTable):
+    '''
+    Binds every variable Identifier within the program to its slot in the table,
+    every function call to its function, and every printing statement to the
+    table's output stream, adds the checks of the table's limits, then returns the program
+    '''
+    blocks = []
+    loops = []
+    for grain in walkGrains(program):
+        if isinstance(grain, Identifier) and not grain.isfunc:
+            grain.slot = table.slotOf(grain.identifier)
+            grain.values = table.VALUES
+        elif isinstance(grain, AsinFunctionCall):
+            # raises MaalatNaSimbolo for unknown functions
+            grain.bindFunction(table.getFunc(grain.funcName.identifier))
+        elif isinstance(grain, PrintStmt):
+            grain.stdout = table.stdout
+        elif isinstance(grain, SaltBlock):
+            blocks.append(grain)
+        elif isinstance(grain, (WhileStmt, ForStmt, ForEachStmt)):
+            loops.append(grain)
+
+    limits = table.limits
+    if limits is not None:
+        # the tree is only changed once it was walked
+        if limits.hook is not None:
+            for block in blocks:
+                block.grains = [HookedStmt(grain, limits.hook) for grain in block.grains]
+        for loop in loops:
+            loop.loopBody.grains.append(LimitCheck(limits))
+    return program
@@ -7,32 +7,61 @@ This file contains the hash table of variables and function names and values
 --------------------------------------------------------------------------------------
 ======================================================================================
 '''
+import sys
 import math
+import mmap
+import array
+import operator
 from asinerrs import *
 from asinhelper import *
 
+# marks a slot whose variable has not been assigned a value (or was removed)
+UNBOUND = object()
+
 class HashTable:
     '''
     Represents a pseudo-hash table as a list of two dictionaries
     '''
-    def __init__(self):
+    def __init__(self, stdin=None, stdout=None, limits=None):
         '''
         SYMBOLS and FUNCTIONS pertain to the indices of the table, and is for our convenience only.
 
-        TABLE is a list of two dictionaries; the first stores variable identifiers as keys pointing
-        to their respective values, the second stores Asin's built-in functions.
+        TABLE is a list of two dictionaries; the first maps variable identifiers to their slots,
+        the second stores Asin's built-in functions. The value of a variable is stored in the list
+        VALUES at the variable's slot; nodes resolved to a slot (see asinresolver.py) read and write
+        it with a single indexing.
         '''
         self.SYMBOLS = 0
         self.FUNCTIONS = 1
 
         self.TABLE = [{},{}]
+        self.VALUES = []
+
+        # the streams that programs using this table print to and read input from;
+        # None stands for the process' own (sys.stdout and sys.stdin)
+        self.stdin = stdin
+        self.stdout = stdout
+        # the limits of the programs run with this table (see asinlimits.py), if any
+        self.limits = limits
+
+    def slotOf(self, varName):
+        '''
+        Returns the slot of an identifier, allocating an unbound one if the
+        identifier is new
+        '''
+        slot = self.TABLE[self.SYMBOLS].get(varName)
+        if slot is None:
+            slot = len(self.VALUES)
+            self.TABLE[self.SYMBOLS][varName] = slot
+            self.VALUES.append(UNBOUND)
+        return slot
 
     def setVar(self, varName, value):
         '''
         Assigns a value to an identifier. The value will become accessible
         through the key, varName.
         '''
-        self.TABLE[self.SYMBOLS][varName] = value
+        self.VALUES[self.slotOf(varName)] = value
 
     def getVar(self, varName):
         '''
@@ -40,15 +69,20 @@ class HashTable:
         If not found, raise an error akin to Python's NameError.
         '''
         if varName in self.TABLE[self.SYMBOLS]:
-            return self.TABLE[self.SYMBOLS][varName]
+            value = self.VALUES[self.TABLE[self.SYMBOLS][varName]]
+            if value is not UNBOUND:
+                return value
         raise MaalatNaSimbolo(varName)
 
     def delVar(self, varName):
         '''
-        Removes an identifier, and consequently the value bound to it,
-        from the first dictionary
+        Unbinds an identifier, and consequently the value bound to it;
+        like deleting a missing key, fails if the identifier is unbound
         '''
-        del self.TABLE[self.SYMBOLS][varName]
+        slot = self.TABLE[self.SYMBOLS].get(varName)
+        if slot is None or self.VALUES[slot] is UNBOUND:
+            raise KeyError(varName)
+        self.VALUES[slot] = UNBOUND
 
     def setFunc(self, funcName, func):
         '''
@@ -70,6 +104,190 @@ class HashTable:
         raise MaalatNaSimbolo(funcName)
 
 
+# ====================================================================================
+#                              ~: Typed numeric arrays :~
+# ====================================================================================
+
+class Hanay(array.array):
+    '''
+    Hanay is an array of numbers of a single type (see bilang_hanay and lutang_hanay).
+    Unlike in a list, its elements are stored as machine values (8 bytes each) rather
+    than as Python objects, and the list functions below run over them natively
+    '''
+
+    # the names of the element types, for error reports
+    TYPENAMES = {'q': 'int', 'd': 'float'}
+
+    def __repr__(self):
+        # printed like a list
+        return repr(self.tolist())
+    def __add__(self, other):
+        return Hanay(self.typecode, array.array.__add__(self, other))
+    def __mul__(self, count):
+        return Hanay(self.typecode, array.array.__mul__(self, count))
+    def __rmul__(self, count):
+        return Hanay(self.typecode, array.array.__mul__(self, count))
+
+def hanayError(typecode, values):
+    '''
+    Returns the error to be raised when one of the values could not be
+    stored in a typed array, or when the values are not a list at all
+    '''
+    if isinstance(values, list):
+        for value in values:
+            try:
+                array.array(typecode, [value])
+            except (TypeError, OverflowError):
+                return MaalatNaHalaga(value.__class__.__name__, value, Hanay.TYPENAMES[typecode])
+    return MaalatNaHalaga(values.__class__.__name__, values, Hanay.TYPENAMES[typecode])
+
+def hanay(typecode, elements):
+    '''
+    Creates a typed array, either of the elements of a list or, given a
+    length, of as many zeroes
+    '''
+    if isinstance(elements, array.array) and elements.typecode != typecode:
+        # e.g. floats from integers; the elements are converted one by one
+        elements = elements.tolist()
+    try:
+        if elements.__class__ is int:
+            return Hanay(typecode, [0]) * elements
+        return Hanay(typecode, elements)
+    except (TypeError, ValueError, OverflowError):
+        # e.g. a string, a float for a length, or a value that does not fit
+        raise hanayError(typecode, elements)
+
+def bilang_hanay(elements):
+    '''
+    Asin function for creating a typed array of integers
+    '''
+    return hanay('q', elements)
+
+def lutang_hanay(elements):
+    '''
+    Asin function for creating a typed array of floats
+    '''
+    return hanay('d', elements)
+
+# ====================================================================================
+#                              ~: Elementwise operations :~
+# ====================================================================================
+
+# Comparison operators accepted by ihambing()
+COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+def elementwise(op, function, left, right):
+    '''
+    Applies a binary operation to each pair of elements of two arrays of the same
+    length, or to each element of an array and a single value. Given two single values,
+    the operation is applied to them as it is. Lists and typed arrays both work; the
+    elements are operated on by map(), without running a loop of the interpreter.
+
+    A typed array operand gives a typed array, of floats if any result is a float.
+    Results that do not fit in a typed array (e.g. integers past 64 bits) are
+    returned as a plain list instead, so that no integer is turned into a float
+    '''
+    if isinstance(left, (list, array.array)):
+        if isinstance(right, (list, array.array)):
+            if len(left) != len(right):
+                raise MaalatNaHalaga(len(left), len(right))
+            results = elementwiseMap(op, function, left, right)
+        else:
+            results = elementwiseMap(op, function, left, [right] * len(left))
+    elif isinstance(right, (list, array.array)):
+        results = elementwiseMap(op, function, [left] * len(right), right)
+    else:
+        return elementwiseMap(op, function, [left], [right])[0]
+
+    typecodes = {operand.typecode for operand in (left, right) if isinstance(operand, Hanay)}
+    if op in COMPARISONS or not typecodes:
+        return results
+    # typed arrays give a typed array, of floats if any element is a float
+    for typecode in ('q', 'd') if typecodes == {'q'} else ('d',):
+        try:
+            return Hanay(typecode, results)
+        except TypeError:
+            pass
+        except OverflowError:
+            break
+    return results
+
+def elementwiseMap(op, function, lefts, rights):
+    '''
+    Returns the list of the results of the operation on each pair of elements;
+    errors are reported for the first pair that fails, as by BinOp.pinch()
+    '''
+    try:
+        return list(map(function, lefts, rights))
+    except (TypeError, ArithmeticError):
+        pass
+    for left, right in zip(lefts, rights):
+        try:
+            function(left, right)
+        except TypeError:
+            raise MaalatNaOperasyon(left, op, right, left.__class__.__name__, op, right.__class__.__name__)
+        except ArithmeticError:
+            raise MaalatNaAritmetika(left.__class__.__name__, left)
+
+def pagsamahin(left, right):
+    '''
+    Asin function for adding arrays (or an array and a number) elementwise
+    '''
+    return elementwise('+', operator.add, left, right)
+
+def ibawas(left, right):
+    '''
+    Asin function for subtracting arrays (or an array and a number) elementwise
+    '''
+    return elementwise('-', operator.sub, left, right)
+
+def paramihin(left, right):
+    '''
+    Asin function for multiplying arrays (or an array and a number) elementwise
+    '''
+    return elementwise('*', operator.mul, left, right)
+
+def hatiin(left, right):
+    '''
+    Asin function for dividing arrays (or an array and a number) elementwise
+    '''
+    return elementwise('/', operator.truediv, left, right)
+
+def hatiin_sahig(left, right):
+    '''
+    Asin function for floor dividing arrays (or an array and a number) elementwise
+    '''
+    return elementwise('//', operator.floordiv, left, right)
+
+def natira(left, right):
+    '''
+    Asin function for getting the remainders of dividing arrays (or an array and
+    a number) elementwise
+    '''
+    return elementwise('%', operator.mod, left, right)
+
+def pataasin(left, right):
+    '''
+    Asin function for raising arrays (or an array and a number) to powers elementwise
+    '''
+    return elementwise('**', operator.pow, left, right)
+
+def ihambing(left, op, right):
+    '''
+    Asin function for comparing arrays (or an array and a value) elementwise,
+    e.g. ihambing(a, "<", b); returns the list of the results
+    '''
+    if op not in COMPARISONS:
+        raise MaalatNaOperasyon(left, op, right, left.__class__.__name__, op, right.__class__.__name__)
+    return elementwise(op, COMPARISONS[op], left, right)
+
 # ====================================================================================
 #                          ~: Asin's Functions (and loader) :~
 # ====================================================================================
@@ -81,7 +299,11 @@ def palitan(array: list, index, value):
     try:
         array[index] = value
     except TypeError:
+        if isinstance(array, Hanay) and isinstance(index, int):
+            raise hanayError(array.typecode, [value])
         raise MaalatNaIndeks(index.__class__.__name__, index)
+    except OverflowError:
+        raise hanayError(array.typecode, [value])
     except IndexError:
         raise MaalatNaIndeks(index, array, 0, len(array) - 1)
 
@@ -89,7 +311,12 @@ def idagdag(array: list, value):
     '''
     Asin function for appending values to an array
     '''
-    array.append(value)
+    try:
+        array.append(value)
+    except (TypeError, OverflowError):
+        if isinstance(array, Hanay):
+            raise hanayError(array.typecode, [value])
+        raise
 
 def tanggalan(array: list):
     '''
@@ -107,7 +334,10 @@ def isaayos(array: list, descending: bool=False):
     '''
     Asin function for sorting an array using Python's native sort() function
     '''
-    if descending:
+    if isinstance(array, Hanay):
+        # typed arrays have no sort(); their contents are replaced by the sorted elements
+        array[:] = Hanay(array.typecode, sorted(array, reverse=bool(descending)))
+    elif descending:
         array.sort(reverse=True)
     else:
         array.sort()
@@ -122,14 +352,73 @@ def baligtad(array: list):
     '''
     Asin function for returning a reversed version of the list argument
     '''
+    if isinstance(array, Hanay):
+        reversedArray = Hanay(array.typecode, array)
+        reversedArray.reverse()
+        return reversedArray
     return list(reversed(array))
 
-def buksan(file, access):
+def nakaayos(array: list):
     '''
-    Asin function for opening a file
+    Asin function for returning a sorted version of the list argument
     '''
+    if isinstance(array, Hanay):
+        return Hanay(array.typecode, sorted(array))
+    return sorted(array)
+
+def hiwain(array: list, start, end):
+    '''
+    Asin function for getting the elements of an array (or the characters of
+    a string) from start up to, but not including, end. Slices of a file opened
+    with the access "m" are read as a string
+    '''
+    if isinstance(array, mmap.mmap):
+        return array[start:end].decode()
+    elif isinstance(array, Hanay):
+        return Hanay(array.typecode, array[start:end])
+    return array[start:end]
+
+def hanapin(array: list, value, start=0):
+    '''
+    Asin function for getting the index of the first occurrence of a value
+    in an array (or of a substring in a string, or in a file opened with the
+    access "m") at or after start; returns -1 if there is none
+    '''
+    if isinstance(array, (mmap.mmap, str)):
+        if not isinstance(value, str):
+            # strings and mapped files only hold substrings
+            raise MaalatNaUri(value.__class__.__name__, value, 'hanapin', 'str')
+        if isinstance(array, mmap.mmap):
+            return array.find(value.encode(), start)
+        return array.find(value, start)
+    try:
+        return array.index(value, start)
+    except ValueError:
+        return -1
+
+def buksan(file, access, buffer=-1):
+    '''
+    Asin function for opening a file; the optional size of its buffer (in bytes)
+    defaults to Python's, 0 leaves a binary file unbuffered (a text file, which
+    cannot go without a buffer, is buffered by line instead), and 1 buffers by line.
+
+    The access "m" maps the file into memory for reading instead: nothing is read
+    until it is used, indexing gives the bytes of the file (as integers), and
+    hiwain and hanapin slice and search it without reading the whole file. An
+    empty file cannot be mapped, and is reported as an error
+    '''
+    if buffer.__class__ is not int:
+        raise MaalatNaUri(buffer.__class__.__name__, buffer, 'buksan', 'int')
+    if buffer == 0 and 'b' not in access:
+        buffer = 1
     try:
-        return open(file, access)
+        if access == 'm':
+            with open(file, 'rb') as mapped:
+                try:
+                    return mmap.mmap(mapped.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    raise MaalatNaFile(file, 'mapped into memory', 'it is empty')
+        return open(file, access, buffer)
     except FileNotFoundError:
         raise MaalatAtNawawalangFile(file)
 
@@ -137,12 +426,16 @@ def basahin(file):
     '''
     Asin function for entirely reading a file
     '''
+    if isinstance(file, mmap.mmap):
+        return file.read().decode()
     return file.read()
 
 def linya(file):
     '''
     Asin function for getting a line from a file at the cursor's current position
     '''
+    if isinstance(file, mmap.mmap):
+        return file.readline().decode()
     return file.readline()
 
 def isulat(file, toWrite):
@@ -151,12 +444,31 @@ def isulat(file, toWrite):
     '''
     file.write(toWrite)
 
+def isulat_lahat(file, lines: list):
+    '''
+    Asin function for writing a list of strings into a file in one call,
+    each as a line of its own
+    '''
+    if not isinstance(lines, (list, array.array)):
+        raise MaalatNaUri(lines.__class__.__name__, lines, 'isulat_lahat', 'list')
+    for line in lines:
+        if line.__class__ is not str:
+            raise MaalatNaUri(line.__class__.__name__, line, 'isulat_lahat', 'str')
+    file.writelines(line + '\n' for line in lines)
+
+def ibuhos(file):
+    '''
+    Asin function for writing whatever is still buffered into a file
+    '''
+    file.flush()
+
 def isara(file):
     '''
-    Asin function for closing a file
+    Asin function for closing a file, after writing whatever is still buffered
     '''
+    file.close()
 
-def asin():
+def asin(stdout=None):
     '''
     This is a superficial function that prints "Asin" in Old English,
     a pile of salt made out of ASCII characters and the language's
@@ -200,7 +512,25 @@ def asin():
     
                Proyekto sa CS 150: Programming Languages, nina
                        Don Rodolfo Abril y Padilla at Jerico Silapan y Lim"""
-    print(image)
+    print(image, file=stdout)
+
+def pahingi(hashtable: HashTable):
+    '''
+    Returns the Asin function for prompting for user input, on the streams of the
+    hash table; Python's own input() is used when they are the process' own
+    '''
+    if hashtable.stdin is None and hashtable.stdout is None:
+        return input
+
+    def prompt(message=''):
+        stdout = hashtable.stdout or sys.stdout
+        stdout.write(str(message))
+        stdout.flush()
+        line = (hashtable.stdin or sys.stdin).readline()
+        if not line:
+            raise EOFError('EOF when reading a line')
+        return line[:-1] if line.endswith('\n') else line
+    return prompt
 
 def kargahan(hashtable: HashTable):
     '''
@@ -238,23 +568,44 @@ def kargahan(hashtable: HashTable):
 
     # list functions
     hashtable.setFunc('palitan', AsinFunction(palitan)) # replaces a value in a list at a certain index
-    hashtable.setFunc('idagdag', AsinFunction(idagdag)) # appends a value to a list
+    if hashtable.limits is None or hashtable.limits.memory is None:
+        hashtable.setFunc('idagdag', AsinFunction(idagdag)) # appends a value to a list
+    else:
+        hashtable.setFunc('idagdag', AsinFunction(hashtable.limits.idagdag)) # appends a value to a list, within the memory limit
     hashtable.setFunc('tanggalan', AsinFunction(tanggalan)) # pops a value from the list
     hashtable.setFunc('silipin', AsinFunction(silipin)) # returns the value of the last element of the list
     hashtable.setFunc('baligtarin', AsinFunction(baligtarin)) # reverses a list in-place
     hashtable.setFunc('baligtad', AsinFunction(baligtad)) # return a reversed version of the list argument
+    hashtable.setFunc('hiwain', AsinFunction(hiwain)) # returns a slice of a list, string or mapped file
+    hashtable.setFunc('hanapin', AsinFunction(hanapin)) # returns the index of a value in a list, string or mapped file
 
     # list functions (sorting)
     hashtable.setFunc('isaayos', AsinFunction(isaayos)) # sort a list in-place
-    hashtable.setFunc('nakaayos', AsinFunction(sorted)) # return a sorted version of the list argument
+    hashtable.setFunc('nakaayos', AsinFunction(nakaayos)) # return a sorted version of the list argument
+
+    # typed numeric arrays
+    hashtable.setFunc('bilang_hanay', AsinFunction(bilang_hanay)) # creates an array of integers
+    hashtable.setFunc('lutang_hanay', AsinFunction(lutang_hanay)) # creates an array of floats
+
+    # elementwise operations on arrays
+    hashtable.setFunc('pagsamahin', AsinFunction(pagsamahin)) # adds elementwise
+    hashtable.setFunc('ibawas', AsinFunction(ibawas)) # subtracts elementwise
+    hashtable.setFunc('paramihin', AsinFunction(paramihin)) # multiplies elementwise
+    hashtable.setFunc('hatiin', AsinFunction(hatiin)) # divides elementwise
+    hashtable.setFunc('hatiin_sahig', AsinFunction(hatiin_sahig)) # floor divides elementwise
+    hashtable.setFunc('natira', AsinFunction(natira)) # gets the remainders of dividing elementwise
+    hashtable.setFunc('pataasin', AsinFunction(pataasin)) # exponentiates elementwise
+    hashtable.setFunc('ihambing', AsinFunction(ihambing)) # compares elementwise, e.g. ihambing(a, "<", b)
 
     # file I/O
-    hashtable.setFunc('pahingi', AsinFunction(input)) # prompts for user input through CLI
+    hashtable.setFunc('pahingi', AsinFunction(pahingi(hashtable))) # prompts for user input through CLI
     hashtable.setFunc('buksan', AsinFunction(buksan)) # creates a file object
     hashtable.setFunc('basahin', AsinFunction(basahin)) # gets all the contents of a file
     hashtable.setFunc('linya', AsinFunction(linya)) # gets a line from the file at the cursor
     hashtable.setFunc('isulat', AsinFunction(isulat)) # writes contents to a file
+    hashtable.setFunc('isulat_lahat', AsinFunction(isulat_lahat)) # writes a list of strings to a file
+    hashtable.setFunc('ibuhos', AsinFunction(ibuhos)) # flushes a file's buffer
     hashtable.setFunc('isara', AsinFunction(isara)) # closes a file
 
     # prints "Asin" and a salt pile in ASCII characters
-    hashtable.setFunc('asin', AsinFunction(asin))
\ No newline at end of file
+    hashtable.setFunc('asin', AsinFunction(lambda: asin(hashtable.stdout)))
\ No newline at end of file
@@ -0,0 +1,44 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the timer of the phases of running an Asin program (importing,
+lexing, parsing, executing, etc.), as reported by ./asin --timing and measured by the
+benchmark suite (see 'benchmarks/suite.py'). A Timings is passed to the Interpreter as
+its timed (see 'asininterpreter.py'):
+
+    timings = Timings()
+    Interpreter(timed=timings).run('ilimbag(1 + 2);')
+    timings.timings     # e.g. {'lex': 0.0001, 'parse': 0.0004, ...}, in seconds
+
+It is imported by ./asin before anything else of the interpreter, so it is kept small.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import time
+
+class Timings:
+    '''
+    Adds up the seconds spent in each phase of running a program
+    '''
+    def __init__(self):
+        # seconds spent in each phase, and the phases being timed, innermost last
+        self.timings = {}
+        self.running = []
+
+    def __call__(self, phase, function, *args, **kwargs):
+        '''
+        Calls the function, adding the time it took to the given phase. Time spent in
+        a phase timed within another (e.g. parsing while compiling) is only counted once
+        '''
+        began = time.perf_counter()
+        self.running.append(phase)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - began
+            self.running.pop()
+            self.timings[phase] = self.timings.get(phase, 0) + elapsed
+            if self.running:
+                self.timings[self.running[-1]] = self.timings.get(self.running[-1], 0) - elapsed
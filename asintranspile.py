@@ -0,0 +1,524 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This file contains the transpiler of Asin. The SaltBlock returned by the parser is
+translated into a Python syntax tree (ast.Module) which is then compiled by Python
+itself, so that Asin's loops run as native loops over local variables.
+
+Variables become locals of a single function (prefixed with 'v_'), copied back into the
+hash table when the program ends, built-in functions
+are fetched once into locals (prefixed with 'f_'), and operations that may fail go
+through the checked helpers below so that the same Maalat errors are raised as when
+walking the tree. Compiled code objects are kept in the on-disk cache (asincache.py),
+so running an unchanged file again skips lexing, parsing and translation entirely.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import re
+import ast
+import marshal
+import functools
+import asincache
+from asinerrs import *
+from asinnodes import *
+from asintable import HashTable
+
+# names of the checked operations within the generated code
+OPNAMES = {
+    '+': 'add', '-': 'sub', '*': 'mul', '/': 'div', '//': 'fdiv', '**': 'pow', '%': 'mod',
+    '>': 'gt', '>=': 'ge', '<': 'lt', '<=': 'le', 'at': 'at', 'o': 'o',
+}
+
+# operations that can never fail when both operands are integers; these
+# are performed natively once the operands are checked to be integers
+INTOPS = {
+    '+': ast.Add, '-': ast.Sub, '*': ast.Mult,
+    '>': ast.Gt, '>=': ast.GtE, '<': ast.Lt, '<=': ast.LtE,
+}
+
+# comparisons that never fail, regardless of the operands
+EQOPS = {'==': ast.Eq, '!=': ast.NotEq}
+
+# if statements with more branches than this are translated into Python ifs one after
+# the other, rather than into an if-elif chain, which Python compiles by recursing
+NESTED_BRANCHES = 100
+
+# switches (see asinoptimizer.py) with at least this many cases look up the position of
+# the block to run in a dictionary, then find it by halving; fewer are compared in turn
+JUMP_TABLE_CASES = 8
+
+# ====================================================================================
+#                         ~: Helpers used by the generated code :~
+# ====================================================================================
+
+def checkedOperation(op):
+    '''
+    Returns a function performing a binary operation, raising
+    the same errors as BinOp.pinch()
+    '''
+    function = BINOPS[op]
+    def operation(left, right):
+        try:
+            return function(left, right)
+        except TypeError:
+            raise MaalatNaOperasyon(left, op, right, left.__class__.__name__, op, right.__class__.__name__)
+        except ArithmeticError:
+            raise MaalatNaAritmetika(left.__class__.__name__, left)
+    return operation
+
+def checkedCompound(op):
+    '''
+    Returns a function performing a compound assignment's operation,
+    raising the same errors as CompAssignStmt.pinch()
+    '''
+    function = BINOPS[op]
+    def operation(oldVal, val):
+        try:
+            return function(oldVal, val)
+        except TypeError:
+            raise MaalatNaOperasyon(oldVal, op, val, oldVal.__class__.__name__, op, val.__class__.__name__)
+    return operation
+
+def negate(operand):
+    try:
+        return -operand
+    except TypeError:
+        raise MaalatNaOperasyon('-', operand.__class__.__name__, '-', operand)
+
+def index(arrId, elemPos):
+    if elemPos.__class__ is int:
+        try:
+            return arrId[elemPos]
+        except (IndexError, TypeError):
+            pass
+    raise indexFailure(arrId, elemPos)
+
+def dropNone(values):
+    '''
+    Comma-separated expressions leave out values that are None (see ExprList.pinch())
+    '''
+    return [value for value in values if value is not None]
+
+def ilimbag(stdout, *values):
+    print(*[value for value in values if value is not None], file=stdout)
+
+def persist(table: HashTable, values, names):
+    '''
+    Copies the program's variables (locals of the generated code, prefixed with 'v_')
+    into their slots in the table; those left unbound are unbound there as well
+    '''
+    for name in names:
+        table.VALUES[table.slotOf(name)] = values.get('v_' + name, UNBOUND)
+
+def runtime(table: HashTable):
+    '''
+    Returns the global namespace in which the generated code runs,
+    using the variables, functions and output stream of the table
+    '''
+    namespace = {
+        '_variable': table.getVar,
+        '_persist': functools.partial(persist, table),
+        '_function': lambda name: table.getFunc(name).funcName,
+        '_negate': negate,
+        '_index': index,
+        '_dropNone': dropNone,
+        '_elementsOf': elementsOf,
+        '_ilimbag': functools.partial(ilimbag, table.stdout),
+    }
+    if table.limits is not None:
+        namespace['_tick'] = table.limits.tick
+    for op, opname in OPNAMES.items():
+        namespace['_op_' + opname] = checkedOperation(op)
+    for compOp, op in COMPOPS.items():
+        namespace['_cop_' + OPNAMES[op]] = checkedCompound(op)
+    return namespace
+
+# ====================================================================================
+#                                ~: The transpiler :~
+# ====================================================================================
+
+def load(name):
+    return ast.Name(id=name, ctx=ast.Load())
+
+def store(name):
+    return ast.Name(id=name, ctx=ast.Store())
+
+def call(function, *arguments):
+    return ast.Call(func=load(function), args=list(arguments), keywords=[])
+
+def isInteger(expression):
+    '''
+    Tells whether an operand can be checked to be an integer without
+    side effects, i.e. if it is a variable or an integer constant
+    '''
+    if isinstance(expression, ast.Constant):
+        return expression.value.__class__ is int
+    return isinstance(expression, ast.Name)
+
+def integerGuard(*operands):
+    '''
+    Returns the test "x.__class__ is int and ..." for the variables among
+    the operands, or None if all operands are constants
+    '''
+    tests = [ast.Compare(left=ast.Attribute(value=load(operand.id), attr='__class__', ctx=ast.Load()),
+                         ops=[ast.Is()], comparators=[load('int')])
+             for operand in operands if isinstance(operand, ast.Name)]
+    if not tests:
+        return None
+    elif len(tests) == 1:
+        return tests[0]
+    return ast.BoolOp(op=ast.And(), values=tests)
+
+class Transpiler:
+    '''
+    Translates a SaltBlock returned by the parser into a Python module; the table
+    tells which functions exist and which variables are bound beforehand
+    '''
+    def __init__(self, table: HashTable):
+        self.table = table
+        # variables and built-in functions the program refers to
+        self.variables = set()
+        self.functions = set()
+        # how many loops enclose the statement being translated
+        self.loopDepth = 0
+        # whether a 'lumisan' was found outside of any loop
+        self.strayExit = False
+        # how many temporary variables (prefixed with 't_') were made
+        self.temporaries = 0
+        # assignments of the dictionaries of switches, done once before the program runs
+        self.jumpTables = []
+
+    def module(self, program: SaltBlock):
+        body = []
+        for grain in program.grains:
+            if isinstance(grain, ExitStmt):
+                # an exit directly within the program does nothing
+                continue
+            self.strayExit = False
+            statements = self.statement(grain)
+            if self.strayExit:
+                # an exit outside of a loop ends only the top-level statement it is in;
+                # the statement is placed in a loop that runs once for 'break' to leave
+                statements = [ast.While(test=ast.Constant(value=True), body=statements + [ast.Break()], orelse=[])]
+            body.extend(statements)
+
+        preamble = []
+        for name in sorted(self.variables):
+            # variables bound beforehand, by kargahan() (e.g. asin_pi) or by earlier programs
+            slot = self.table.TABLE[self.table.SYMBOLS].get(name)
+            if slot is not None and self.table.VALUES[slot] is not UNBOUND:
+                preamble.append(ast.Assign(targets=[store('v_' + name)], value=call('_variable', ast.Constant(value=name))))
+        for name in sorted(self.functions):
+            preamble.append(ast.Assign(targets=[store('f_' + name)], value=call('_function', ast.Constant(value=name))))
+        preamble.extend(self.jumpTables)
+        if self.variables:
+            # the variables are copied back into the table when the program ends, even
+            # by an error, as walking the tree would have left them there
+            persist = ast.Expr(value=call('_persist', call('locals'), ast.Constant(value=tuple(sorted(self.variables)))))
+            body = [ast.Try(body=body or [ast.Pass()], handlers=[], orelse=[], finalbody=[persist])]
+
+        main = ast.FunctionDef(name='__asin__', args=ast.arguments(posonlyargs=[], args=[], vararg=None, kwonlyargs=[],
+                                                                   kw_defaults=[], kwarg=None, defaults=[]),
+                               body=preamble + body or [ast.Pass()], decorator_list=[], returns=None)
+        module = ast.Module(body=[main, ast.Expr(value=call('__asin__'))], type_ignores=[])
+        return ast.fix_missing_locations(module)
+
+    def block(self, block: SaltBlock):
+        statements = []
+        for grain in block:
+            statements.extend(self.statement(grain))
+        # a block may be left empty by the optimizer (see asinoptimizer.py)
+        return statements or [ast.Pass()]
+
+    def loopBody(self, block: SaltBlock):
+        '''
+        Translates the body of a loop; with limits (see asinlimits.py), every
+        turn of the loop ends by counting it against them, as LimitCheck does
+        '''
+        self.loopDepth += 1
+        statements = self.block(block)
+        self.loopDepth -= 1
+        if self.table.limits is not None:
+            statements.append(ast.Expr(value=call('_tick')))
+        return statements
+
+    def temporary(self):
+        '''
+        Returns the name of a new temporary variable, for values kept within a statement
+        '''
+        self.temporaries += 1
+        return 't_{}'.format(self.temporaries)
+
+    def statement(self, grain):
+        '''
+        Translates a statement into a list of Python statements
+        '''
+        if isinstance(grain, AsinFunctionCall):
+            return [ast.Expr(value=self.expression(grain))]
+        return getattr(self, 'translate' + grain.__class__.__name__)(grain)
+
+    def expression(self, grain):
+        return getattr(self, 'translate' + grain.__class__.__name__)(grain)
+
+    def exprList(self, block: ExprList):
+        return [self.expression(grain) for grain in block]
+
+    # ~: Expressions :~
+
+    def translatePrimitive(self, grain: Primitive):
+        return ast.Constant(value=grain.value)
+
+    def translateIdentifier(self, grain: Identifier):
+        self.variables.add(grain.identifier)
+        return load('v_' + grain.identifier)
+
+    def translateArray(self, grain: Array):
+        if grain.entries is None:
+            return ast.List(elts=[], ctx=ast.Load())
+        entries = ast.List(elts=self.exprList(grain.entries), ctx=ast.Load())
+        if all(isinstance(entry, (Primitive, Array)) for entry in grain.entries):
+            return entries
+        return call('_dropNone', entries)
+
+    def translateBinOp(self, grain: BinOp):
+        left = self.expression(grain.left)
+        right = self.expression(grain.right)
+        op = grain.op
+
+        if op in EQOPS:
+            return ast.Compare(left=left, ops=[EQOPS[op]()], comparators=[right])
+
+        checked = call('_op_' + OPNAMES[op], left, right)
+        if op in INTOPS and isInteger(left) and isInteger(right):
+            guard = integerGuard(left, right)
+            if guard is not None:
+                if op in ('+', '-', '*'):
+                    native = ast.BinOp(left=left, op=INTOPS[op](), right=right)
+                else:
+                    native = ast.Compare(left=left, ops=[INTOPS[op]()], comparators=[right])
+                return ast.IfExp(test=guard, body=native, orelse=checked)
+        elif op in ('at', 'o') and isinstance(right, ast.Constant):
+            # both operands are still evaluated, as the right one is a constant
+            return ast.BoolOp(op=ast.And() if op == 'at' else ast.Or(), values=[left, right])
+        return checked
+
+    def translateOpChain(self, grain: OpChain):
+        '''
+        Translates a long chain of operations into a tuple assigning the result of each
+        to a temporary in turn, e.g. "(t_1 := a, t_1 := _op_add(t_1, b), ...)[-1]", as
+        Python compiles operations nested within each other by recursing
+        '''
+        temporary = self.temporary()
+        values = [ast.NamedExpr(target=store(temporary), value=self.expression(grain.first))]
+        for op, operand in grain.steps:
+            right = self.expression(operand)
+            if op in EQOPS:
+                result = ast.Compare(left=load(temporary), ops=[EQOPS[op]()], comparators=[right])
+            else:
+                result = call('_op_' + OPNAMES[op], load(temporary), right)
+            values.append(ast.NamedExpr(target=store(temporary), value=result))
+        return ast.Subscript(value=ast.Tuple(elts=values, ctx=ast.Load()), slice=ast.Constant(value=-1), ctx=ast.Load())
+
+    def translateUnaOp(self, grain: UnaOp):
+        operand = self.expression(grain.expression)
+        if grain.op == 'hindi':
+            return ast.UnaryOp(op=ast.Not(), operand=operand)
+        if isInteger(operand):
+            native = ast.UnaryOp(op=ast.USub(), operand=operand)
+            guard = integerGuard(operand)
+            if guard is None:
+                return native
+            return ast.IfExp(test=guard, body=native, orelse=call('_negate', operand))
+        return call('_negate', operand)
+
+    def translateArrAccess(self, grain: ArrAccess):
+        return call('_index', self.expression(grain.arrName), self.expression(grain.index))
+
+    def translateAsinFunctionCall(self, grain: AsinFunctionCall):
+        name = grain.funcName.identifier
+        # like the resolver, unknown functions are reported before running
+        self.table.getFunc(name)
+        self.functions.add(name)
+        arguments = self.exprList(grain.arguments) if grain.arguments is not None else []
+        return call('f_' + name, *arguments)
+
+    # ~: Statements :~
+
+    def translateAssignStmt(self, grain: AssignStmt):
+        self.variables.add(grain.ident.identifier)
+        return [ast.Assign(targets=[store('v_' + grain.ident.identifier)], value=self.expression(grain.value))]
+
+    def translateCompAssignStmt(self, grain: CompAssignStmt):
+        op = COMPOPS[grain.op]
+        ident = self.expression(grain.ident)
+        value = self.expression(grain.value)
+        result = call('_cop_' + OPNAMES[op], ident, value)
+        if op in ('+', '-', '*') and isInteger(value):
+            # e.g. "n += 1" is a native addition whenever n is an integer
+            guard = integerGuard(ident, value)
+            native = ast.BinOp(left=load(ident.id), op=INTOPS[op](), right=value)
+            result = ast.IfExp(test=guard, body=native, orelse=result)
+        return [ast.Assign(targets=[store(ident.id)], value=result)]
+
+    def translateIfStmt(self, grain: IfStmt):
+        orelse = self.block(grain.elseSeg) if grain.elseSeg is not None else []
+        if len(grain.branches) > NESTED_BRANCHES:
+            return self.flatIfStmt(grain, orelse)
+        for condition, block in reversed(grain.branches):
+            orelse = [ast.If(test=self.expression(condition), body=self.block(block), orelse=orelse)]
+        return orelse
+
+    def flatIfStmt(self, grain: IfStmt, orelse):
+        '''
+        Translates an if statement with many else-ifs into Python ifs one after the
+        other; once a branch is taken, a temporary tells the ifs after it to skip
+        '''
+        taken = self.temporary()
+        statements = [ast.Assign(targets=[store(taken)], value=ast.Constant(value=False))]
+        for condition, block in grain.branches:
+            test = ast.BoolOp(op=ast.And(), values=[ast.UnaryOp(op=ast.Not(), operand=load(taken)),
+                                                    self.expression(condition)])
+            body = [ast.Assign(targets=[store(taken)], value=ast.Constant(value=True))] + self.block(block)
+            statements.append(ast.If(test=test, body=body, orelse=[]))
+        if orelse:
+            statements.append(ast.If(test=ast.UnaryOp(op=ast.Not(), operand=load(taken)), body=orelse, orelse=[]))
+        return statements
+
+    def translateSwitchStmt(self, grain: SwitchStmt):
+        '''
+        Translates a switch: the value compared is kept in a temporary, then either
+        compared with each constant, or looked up in a dictionary for the position
+        of the block to run, which is found by halving the range of positions
+        '''
+        subject = self.temporary()
+        statements = [ast.Assign(targets=[store(subject)], value=self.expression(grain.subject))]
+        bodies = [self.block(block) for block in grain.blocks]
+        orelse = self.block(grain.elseSeg) if grain.elseSeg is not None else []
+        constants = sorted(grain.cases, key=grain.cases.get)
+
+        if len(bodies) < JUMP_TABLE_CASES:
+            for constant, body in reversed(list(zip(constants, bodies))):
+                test = ast.Compare(left=load(subject), ops=[ast.Eq()], comparators=[ast.Constant(value=constant)])
+                orelse = [ast.If(test=test, body=body, orelse=orelse)]
+            return statements + orelse
+
+        jumpTable = self.temporary()
+        self.jumpTables.append(ast.Assign(targets=[store(jumpTable)], value=ast.Dict(
+            keys=[ast.Constant(value=constant) for constant in constants],
+            values=[ast.Constant(value=position) for position in range(len(constants))])))
+        # the else clause is at the position after the last block
+        position = self.temporary()
+        missing = ast.Constant(value=len(bodies))
+        lookup = ast.Call(func=ast.Attribute(value=load(jumpTable), attr='get', ctx=ast.Load()),
+                          args=[load(subject), missing], keywords=[])
+        statements.append(ast.Try(body=[ast.Assign(targets=[store(position)], value=lookup)],
+                                  handlers=[ast.ExceptHandler(type=load('TypeError'), name=None,
+                                                              body=[ast.Assign(targets=[store(position)], value=missing)])],
+                                  orelse=[], finalbody=[]))
+        statements.extend(self.dispatch(position, bodies + [orelse or [ast.Pass()]], 0, len(bodies) + 1))
+        return statements
+
+    def dispatch(self, position, bodies, low, high):
+        '''
+        Returns the Python statements running the body at the position, which is
+        known to be within bodies[low:high]
+        '''
+        if high - low == 1:
+            return bodies[low]
+        middle = (low + high) // 2
+        test = ast.Compare(left=load(position), ops=[ast.Lt()], comparators=[ast.Constant(value=middle)])
+        return [ast.If(test=test, body=self.dispatch(position, bodies, low, middle),
+                       orelse=self.dispatch(position, bodies, middle, high))]
+
+    def translateWhileStmt(self, grain: WhileStmt):
+        condition = self.expression(grain.condition)
+        loopBody = self.loopBody(grain.loopBody)
+        return [ast.While(test=condition, body=loopBody, orelse=[])]
+
+    def translateForStmt(self, grain: ForStmt):
+        name = grain.iterator.identifier
+        self.variables.add(name)
+        bounds = call('range', self.expression(grain.start),
+                      ast.BinOp(left=self.expression(grain.end), op=ast.Add(), right=ast.Constant(value=1)))
+        loopBody = self.loopBody(grain.loopBody)
+
+        # the iterator is removed after the loop; when the loop never ran and the
+        # variable was never bound, this fails just like HashTable.delVar()
+        delete = ast.Try(body=[ast.Delete(targets=[ast.Name(id='v_' + name, ctx=ast.Del())])],
+                         handlers=[ast.ExceptHandler(type=load('NameError'), name=None,
+                                                     body=[ast.Raise(exc=call('KeyError', ast.Constant(value=name)), cause=ast.Constant(value=None))])],
+                         orelse=[], finalbody=[])
+        return [ast.For(target=store('v_' + name), iter=bounds, body=loopBody, orelse=[]), delete]
+
+    def translateForEachStmt(self, grain: ForEachStmt):
+        name = grain.iterator.identifier
+        self.variables.add(name)
+        iterable = self.expression(grain.iterable)
+        loopBody = self.loopBody(grain.loopBody)
+
+        # the iterator is removed after the loop, if it was ever bound
+        delete = ast.Try(body=[ast.Delete(targets=[ast.Name(id='v_' + name, ctx=ast.Del())])],
+                         handlers=[ast.ExceptHandler(type=load('NameError'), name=None, body=[ast.Pass()])],
+                         orelse=[], finalbody=[])
+        return [ast.For(target=store('v_' + name), iter=call('_elementsOf', iterable), body=loopBody, orelse=[]), delete]
+
+    def translatePrintStmt(self, grain: PrintStmt):
+        return [ast.Expr(value=call('_ilimbag', *self.exprList(grain.toPrint)))]
+
+    def translateExitStmt(self, grain: ExitStmt):
+        if self.loopDepth == 0:
+            self.strayExit = True
+        return [ast.Break()]
+
+# ====================================================================================
+#                         ~: Compiling, caching and running :~
+# ====================================================================================
+
+def compileProgram(program: SaltBlock, table: HashTable, filename='<asin>'):
+    '''
+    Translates the program into a Python module and compiles it into a code object
+    '''
+    return compile(Transpiler(table).module(program), filename, 'exec')
+
+def cachedCompile(sourceCode, filename, parse, table: HashTable, cached=True):
+    '''
+    Returns the code object of the source code, loading it from the on-disk cache
+    when the same source was compiled before. parse(sourceCode) is only called
+    (and the result compiled and cached) when the cache misses; nothing is cached
+    unless cached is true. The code depends on the table's built-in functions,
+    which are the same for every table filled by kargahan(), on whether the table
+    has limits, and on which variables are bound in the table beforehand (loaded
+    in the code's preamble), all of which are part of the key it is cached under
+    '''
+    if not cached:
+        return compileProgram(parse(sourceCode), table, filename)
+    symbols = table.TABLE[table.SYMBOLS]
+    bound = sorted(name for name, slot in symbols.items() if table.VALUES[slot] is not UNBOUND)
+    key = asincache.sourceKey(sourceCode, table.limits is not None, bound)
+    path = asincache.cachePath(filename, key, '.asinc')
+    cached = asincache.load(path)
+    if cached is not None:
+        try:
+            return marshal.loads(cached)
+        except (EOFError, ValueError, TypeError):
+            # a corrupted entry is compiled and written again
+            pass
+    code = compileProgram(parse(sourceCode), table, filename)
+    asincache.store(path, marshal.dumps(code))
+    return code
+
+def execute(code, table: HashTable):
+    '''
+    Runs a code object produced by compileProgram() with the table's
+    functions and output stream
+    '''
+    try:
+        exec(code, runtime(table))
+    except NameError as error:
+        # reading a variable before (or without ever) assigning to it
+        variable = re.search(r"'v_(\w+)'", str(error))
+        if variable is None:
+            raise
+        raise MaalatNaSimbolo(variable.group(1)) from None
@@ -8,21 +8,36 @@ Backus-Naur Form as compliant with yacc.
 ======================================================================================
 --------------------------------------------------------------------------------------
 '''
-import sys
+import os
 import ply.yacc as yacc
+import asincache
 from asinlex import *
 from asinnodes import *
 from asinerrs import *
 
-# Setting the precedence rules of operators
+# Setting the precedence rules of operators; the logical and comparison operators are
+# left-associative too, so that long chains of them nest to the left (and are flattened
+# into an OpChain by the optimizer, see asinoptimizer.py) rather than to the right
 precedence = (
+    ('left', 'OR'),
+    ('left', 'AND'),
+    ('left', 'EQ', 'NEQ', 'GT', 'GTE', 'LT', 'LTE'),
     ('left', 'NOT'),
     ('left', 'PLUS', 'MINUS'),
     ('left', 'MUL', 'DIV', 'FDIV'),
     ('left', 'EXP', 'MOD'),
     ('right', 'UMINUS'),
+    ('left', 'LSQUARE'),
 )
 
+def atLine(grain, p, n):
+    '''
+    Marks the node with the line of the n-th symbol of the rule (a token), e.g. the
+    operator of a binary operation, for the profiler (see asinprofile.py)
+    '''
+    grain.lineno = p.lineno(n)
+    return grain
+
 def p_stmtBlock(p):
     '''
     statementblock : statementblock statement
@@ -53,7 +68,7 @@ def p_assignStmt(p):
     assign_statement : identifier EQUALS expression SMCOLON
     '''
     # if assigning a value to a variable
-    p[0] = AssignStmt(p[1], p[3])
+    p[0] = atLine(AssignStmt(p[1], p[3]), p, 2)
 
 def p_compAssignStmt(p):
     '''
@@ -65,28 +80,33 @@ def p_compAssignStmt(p):
                           | identifier EXPEQUALS expression SMCOLON
                           | identifier MODEQUALS expression SMCOLON
     '''
-    p[0] = CompAssignStmt(p[1], p[2], p[3])
+    p[0] = atLine(CompAssignStmt(p[1], p[2], p[3]), p, 2)
 
 def p_ifStmt(p):
     '''
-    if_statement : IF LPAREN expression RPAREN LCURLY statementblock RCURLY
-                 | IF LPAREN expression RPAREN LCURLY statementblock RCURLY ELSE LCURLY statementblock RCURLY
-                 | IF LPAREN expression RPAREN LCURLY statementblock RCURLY BUT if_statement
+    if_statement : if_chain
+                 | if_chain ELSE LCURLY statementblock RCURLY
     '''
-    plen = len(p)
-    if plen == 8:
+    if len(p) == 6:
+        # if an else clause ends the chain of if and else-if clauses
+        p[1].elseSeg = p[4]
+    p[0] = p[1]
+
+def p_ifChain(p):
+    '''
+    if_chain : IF LPAREN expression RPAREN LCURLY statementblock RCURLY
+             | if_chain BUT IF LPAREN expression RPAREN LCURLY statementblock RCURLY
+    '''
+    if len(p) == 8:
         # Rule 1:
-        # if only an if clause is recognized
-        p[0] = IfStmt(p[3], p[6])
-    elif plen == 12:
+        # the if clause starts the statement
+        p[0] = atLine(IfStmt([(p[3], p[6])]), p, 1)
+    else:
         # Rule 2:
-        # if an if clause and an else-if clause are recognized
-        # allows an else clause to still exist since statementblock (p[8]) can be another if_statement
-        p[0] = IfStmt(p[3], p[6], p[10])
-    elif plen == 10:
-        # Rule 3:
-        # if only an if clause and else clause is recognized
-        p[0] = IfStmt(p[3], p[6], p[9])
+        # every else-if clause is appended to the branches of the same statement (p[1]),
+        # so that a long chain of them is a single flat IfStmt rather than nested ones
+        p[1].branches.append((p[5], p[8]))
+        p[0] = p[1]
 
 def p_loopStmt(p):
     '''
@@ -99,19 +119,24 @@ def p_whileStmt(p):
     '''
     while_statement : WHILE LPAREN expression RPAREN LCURLY statementblock RCURLY
     '''
-    p[0] = WhileStmt(p[3], p[6])
+    p[0] = atLine(WhileStmt(p[3], p[6]), p, 1)
 
 def p_forStmt(p):
     '''
     for_statement : IN FOR identifier IN LSQUARE expression COLON expression RSQUARE LCURLY statementblock RCURLY
+                  | IN FOR identifier IN expression LCURLY statementblock RCURLY
     '''
-    p[0] = ForStmt(p[3], p[6], p[8], p[11])
+    if len(p) == 13:
+        p[0] = atLine(ForStmt(p[3], p[6], p[8], p[11]), p, 1)
+    else:
+        # iterating over the elements of an array, or the lines of a file
+        p[0] = atLine(ForEachStmt(p[3], p[5], p[7]), p, 1)
 
 def p_printStmt(p):
     '''
     print_statement : PRINT LPAREN commasepexpr RPAREN SMCOLON
     '''
-    p[0] = PrintStmt(p[3])
+    p[0] = atLine(PrintStmt(p[3]), p, 1)
 
 def p_functionCallStatement(p):
     '''
@@ -128,21 +153,21 @@ def p_functionCall(p):
     p[1].isfunc = True
     plen = len(p)
     if plen == 5:
-        p[0] = AsinFunctionCall(p[1], p[3])
+        p[0] = atLine(AsinFunctionCall(p[1], p[3]), p, 2)
     elif plen == 4:
-        p[0] = AsinFunctionCall(p[1])
+        p[0] = atLine(AsinFunctionCall(p[1]), p, 2)
 
 def p_exitStmt(p):
     '''
     exit_statement : EXIT SMCOLON
     '''
-    p[0] = ExitStmt()
+    p[0] = atLine(ExitStmt(), p, 1)
 
 def p_identifier(p):
     '''
     identifier : ID
     '''
-    p[0] = Identifier(p[1])
+    p[0] = atLine(Identifier(p[1]), p, 1)
 
 def p_primitive(p):
     '''
@@ -152,7 +177,7 @@ def p_primitive(p):
               | TRUE
               | FALSE
     '''
-    p[0] = Primitive(p[1])
+    p[0] = atLine(Primitive(p[1]), p, 1)
 
 def p_exprCondition(p):
     '''
@@ -165,7 +190,7 @@ def p_exprCondition(p):
                | expression AND expression
                | expression OR expression
     '''
-    p[0] = BinOp(p[1], p[2], p[3])
+    p[0] = atLine(BinOp(p[1], p[2], p[3]), p, 2)
 
 def p_exprBinMathOp(p):
     '''
@@ -177,25 +202,20 @@ def p_exprBinMathOp(p):
                | expression EXP expression
                | expression MOD expression
     '''
-    p[0] = BinOp(p[1], p[2], p[3])
+    p[0] = atLine(BinOp(p[1], p[2], p[3]), p, 2)
 
 def p_exprUnaOp(p):
     '''
     expression : MINUS expression %prec UMINUS
                | NOT expression
     '''
-    p[0] = UnaOp(p[1], p[2])
+    p[0] = atLine(UnaOp(p[1], p[2]), p, 1)
 
 def p_exprGroup(p):
     '''
     expression : LPAREN expression RPAREN
     '''
-    if isinstance(p[2], Grain):
-        # if expression (p[2]) is expandable
-        p[0] = p[2]
-    else:
-        # if expression (p[2]) is a primitive
-        Primitive(p[2])
+    p[0] = p[2]
 
 def p_exprArr(p):
     '''
@@ -204,15 +224,15 @@ def p_exprArr(p):
     '''
     plen = len(p)
     if plen == 3:
-        p[0] = Array()
+        p[0] = atLine(Array(), p, 1)
     elif plen == 4:
-        p[0] = Array(p[2])
+        p[0] = atLine(Array(p[2]), p, 1)
 
 def p_exprArrAccess(p):
     '''
-    expression : identifier LSQUARE expression RSQUARE
+    expression : expression LSQUARE expression RSQUARE
     '''
-    p[0] = ArrAccess(p[1], p[3])
+    p[0] = atLine(ArrAccess(p[1], p[3]), p, 2)
 
 def p_exprAtom(p):
     '''
@@ -231,13 +251,12 @@ def p_commasepexpr(p):
     plen = len(p)
     if plen == 1:
         # if there are no arguments
-        p[0] = SaltBlock()
-        # pass
-    if plen == 2:
+        p[0] = ExprList()
+    elif plen == 2:
         # if the argument is singular
-        p[0] = SaltBlock([p[1]])
+        p[0] = ExprList([p[1]])
     else:
-        # if there is more than 1 argument, repeatedly append expression (p[3]) to parent node SaltBlock
+        # if there is more than 1 argument, repeatedly append expression (p[3]) to parent node ExprList
         p[1].grains.append(p[3])
         p[0] = p[1]
 
@@ -245,14 +264,46 @@ def p_error(p):
     '''
     This defines the errors that yacc will raise upon encountering faulty syntax
     '''
-    line = open(sys.argv[1]).readlines()[p.lineno - 1]
     if p is not None:
-        raise MaalatNaPalaugnayan(p.lineno, findColumn(sys.argv[1], p), p.value, line)
+        # the offending line is taken from the source code being lexed
+        source = sourceOf(p.lexer)
+        raise MaalatNaPalaugnayan(p.lineno, findColumn(source, p), p.value, source.line(p.lineno))
     else:
         raise MaalatNaPalaugnayan()
 
-def buildParser():
+def parseTableName():
     '''
-    Builds the parser through yacc.yacc() and returns it
+    Returns the name of the file that the LALR tables generated for the current
+    grammar are pickled into, in the cache
     '''
-    return yacc.yacc(errorlog=yacc.NullLogger())
\ No newline at end of file
+    return 'asinparsetab_{}.pickle'.format(asincache.grammarDigest(globals(), 'p_', precedence, tokens, yacc.__tabversion__))
+
+def buildParser():
+    '''
+    Builds the parser through yacc.yacc() and returns it. The LALR tables are read from
+    the cache (see asincache.py) when they were generated for the same grammar before;
+    otherwise they are generated and pickled there for the next runs
+    '''
+    path = asincache.tablePath(parseTableName())
+    if os.path.exists(path):
+        try:
+            return yacc.yacc(optimize=1, debug=False, picklefile=path, errorlog=yacc.NullLogger())
+        except Exception:
+            # an unreadable table is generated again
+            pass
+
+    try:
+        temporary = asincache.temporaryPath(path)
+    except OSError:
+        # the cache cannot be created; the tables are not written anywhere
+        return yacc.yacc(debug=False, write_tables=False, errorlog=yacc.NullLogger())
+
+    # the tables are pickled under a temporary name, then moved to their path,
+    # so that concurrent runs never read partially written tables
+    parser = yacc.yacc(optimize=1, debug=False, picklefile=temporary, errorlog=yacc.NullLogger())
+    try:
+        os.replace(temporary, path)
+        asincache.removeStaleTables(path)
+    except OSError:
+        pass
+    return parser
\ No newline at end of file
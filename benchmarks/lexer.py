@@ -0,0 +1,97 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This is the lexer benchmark of the Asin interpreter. It generates about 1 MB of Asin
+source code (assignments, conditionals, loops, strings, comments and blank lines) and
+lexes it with both lexers of 'asinlex.py', the one generated by PLY and the single-pass
+RegexLexer, reporting the tokens lexed per second by each. The two must produce the
+same tokens (types, values, lines and positions); the script exits with status 1 if
+they do not.
+
+    python benchmarks/lexer.py [--runs N] [--size BYTES]
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from asinlex import buildLexer, SourceBuffer
+
+# the statements the input is made of, repeated with a different number each time
+TEMPLATE = '''\
+# kaso {0}
+x{0} = ({0} + 2.5) * y // 3 ** 2 - z[{0}] % 7;
+kapag (x{0} >= 10 at hindi Huwad) {{
+    ilimbag("kaso {0}", x{0});
+}} ngunit kapag (x{0} != 3 o Totoo) {{
+    x{0} += 1;
+}} kundiman {{
+    lumisan;
+}}
+
+sa bawat i sa [0:{0}] {{ s -= i; t *= 2; u /= 4; v //= 5; w **= 1; r %= 3; }}
+hanggat (a <= b) {{ a = haba([1, 2, 3]) : 2; }}
+'''
+
+def generate(size):
+    '''
+    Returns Asin source code of at least the given size in bytes
+    '''
+    parts = []
+    length = 0
+    number = 0
+    while length < size:
+        part = TEMPLATE.format(number)
+        parts.append(part)
+        length += len(part)
+        number += 1
+    return ''.join(parts)
+
+def lex(kind, source):
+    '''
+    Lexes the source code with the given kind of lexer and
+    returns its tokens along with the seconds it took
+    '''
+    lexer = buildLexer(kind)
+    lexer.source = SourceBuffer(source)
+    began = time.perf_counter()
+    lexer.input(source)
+    lexer.lineno = 1
+    tokens = list(lexer)
+    return tokens, time.perf_counter() - began
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the throughput of the Asin lexers')
+    parser.add_argument('--runs', type=int, default=5, help='runs per lexer (default: 5)')
+    parser.add_argument('--size', type=int, default=1 << 20, help='bytes of source code (default: 1 MiB)')
+    args = parser.parse_args()
+
+    source = generate(args.size)
+    results = {}
+    print('{:<8} {:>10} {:>12} {:>16}'.format('lexer', 'tokens', 'best (ms)', 'tokens/second'))
+    for kind in ('ply', 'regex'):
+        best = None
+        for run in range(args.runs):
+            tokens, elapsed = lex(kind, source)
+            best = elapsed if best is None else min(best, elapsed)
+        results[kind] = [(token.type, token.value, token.lineno, token.lexpos) for token in tokens]
+        print('{:<8} {:>10} {:>12.2f} {:>16,.0f}'.format(kind, len(tokens), best * 1000, len(tokens) / best))
+
+    if results['ply'] != results['regex']:
+        for position, (expected, got) in enumerate(zip(results['ply'], results['regex'])):
+            if expected != got:
+                print('The lexers differ at token {}: {} (ply) and {} (regex)'.format(position, expected, got))
+                break
+        else:
+            print('The lexers lexed {} and {} tokens'.format(len(results['ply']), len(results['regex'])))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This is the startup benchmark of the Asin interpreter. Each case launches a fresh
+Python process running asin.py, as a job runner would, and reports how long it took
+from launch to exit. The cases are a minimal program, the bundled sample problems
+(fed with canned input in place of a user) and the guide printed without a file.
+
+    python benchmarks/startup.py [--runs N] [--cold] [--budget MS]
+
+--cold points ASIN_CACHE_DIR to an empty directory on every run, so that the PLY
+tables (and --compile's code objects) are generated anew; --budget makes the script
+exit with status 1 if the median of any case exceeds the given milliseconds.
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTERPRETER = os.path.join(ROOT, 'asin.py')
+
+# (name, source file or None for the guide, standard input, options)
+CASES = [
+    ('guide', None, '', []),
+    ('minimal', 'x = 0;\n', '', []),
+    ('minimal --closures', 'x = 0;\n', '', ['--closures']),
+    ('minimal --compile', 'x = 0;\n', '', ['--compile']),
+    ('hanoi', os.path.join(ROOT, 'sampleprobHanoi.asin'), '3\nA\nB\nC\n', []),
+    ('hanoi --compile', os.path.join(ROOT, 'sampleprobHanoi.asin'), '3\nA\nB\nC\n', ['--compile']),
+    ('heapsort', os.path.join(ROOT, 'sampleprobHeapsort.asin'), '5\n3\n1\n4\n1\n5\n', []),
+    ('heapsort --compile', os.path.join(ROOT, 'sampleprobHeapsort.asin'), '5\n3\n1\n4\n1\n5\n', ['--compile']),
+]
+
+def launch(filename, stdin, options, environment):
+    '''
+    Runs the interpreter once and returns the elapsed time in milliseconds
+    '''
+    command = [sys.executable, INTERPRETER] + options + ([filename] if filename else [])
+    began = time.perf_counter()
+    subprocess.run(command, input=stdin.encode(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   env=environment, check=False)
+    return (time.perf_counter() - began) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the startup time of the Asin interpreter')
+    parser.add_argument('--runs', type=int, default=10, help='launches per case (default: 10)')
+    parser.add_argument('--cold', action='store_true', help='start every run with an empty cache')
+    parser.add_argument('--budget', type=float, default=None, help='fail if a median exceeds this many ms')
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix='asinbench')
+    environment = dict(os.environ)
+    overBudget = []
+    try:
+        print('{:<22} {:>10} {:>10} {:>10}'.format('case', 'min (ms)', 'median', 'max'))
+        for name, source, stdin, options in CASES:
+            filename = source
+            if source is not None and not os.path.exists(source):
+                # inline programs are written into the workspace
+                filename = os.path.join(workspace, 'minimal.asin')
+                with open(filename, 'w') as program:
+                    program.write(source)
+
+            times = []
+            for run in range(args.runs):
+                if args.cold:
+                    cache = os.path.join(workspace, 'cache')
+                    shutil.rmtree(cache, ignore_errors=True)
+                    environment['ASIN_CACHE_DIR'] = cache
+                times.append(launch(filename, stdin, options, environment))
+
+            median = statistics.median(times)
+            print('{:<22} {:>10.1f} {:>10.1f} {:>10.1f}'.format(name, min(times), median, max(times)))
+            if args.budget is not None and median > args.budget:
+                overBudget.append(name)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    if overBudget:
+        print('Over the budget of {} ms: {}'.format(args.budget, ', '.join(overBudget)))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
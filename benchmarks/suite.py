@@ -0,0 +1,280 @@
+'''
+--------------------------------------------------------------------------------------
+======================================================================================
+
+This is the benchmark suite of the Asin interpreter. Each case is an Asin program run
+in this process, through every backend (walking the tree, --closures and --compile),
+with the time spent in each phase measured apart:
+
+    lex      - turning the source code into tokens
+    parse    - building the tree from the tokens, and optimizing it
+    compile  - binding the tree to the table, and compiling it (closures or bytecode)
+    execute  - running the program
+
+The cases are the two sample problems, with their input written into the programs
+(see benchmarks/programs/), and generated programs that each stress one thing: tight
+arithmetic loops, array indexing, built-in function calls, string concatenation, long
+kapag/ngunit chains and large literal arrays. Every case counts the operations it does
+(e.g. the turns of its loop, or the moves of the disks), reported per second of
+execution, and the peak memory allocated while it runs (measured in a separate run,
+under tracemalloc). The backends must print the same output for every case; the script
+exits with status 1 if they do not.
+
+    python benchmarks/suite.py [--runs N] [--scale X] [--backends B,...] [CASE ...]
+                               [--save [FILE]] [--compare FILE] [--threshold PERCENT]
+
+--save writes the results as JSON (into benchmarks/results/<commit>.json if no file is
+given), so that they may be compared with those of another version of the interpreter:
+--compare reads such a file and reports the change in the time of every case, exiting
+with status 1 if any got slower by more than the threshold (10% unless given).
+
+======================================================================================
+--------------------------------------------------------------------------------------
+'''
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import asintiming
+from asininterpreter import Interpreter, BACKENDS
+
+PROGRAMS = os.path.join(ROOT, 'benchmarks', 'programs')
+RESULTS = os.path.join(ROOT, 'benchmarks', 'results')
+
+# phases reported, and the phases of the interpreter (see asininterpreter.py) each is made of
+PHASES = {
+    'lex': ('lex',),
+    'parse': ('parse', 'optimize'),
+    'compile': ('resolve', 'compile'),
+    'execute': ('execute',),
+}
+
+def arithmetic(size):
+    return '''\
+s = 0;
+sa bawat i sa [1:{0}] {{
+    s = s + i * 3 - i % 7 // 2;
+}}
+ilimbag(s);
+'''.format(size)
+
+def indexing(size):
+    return '''\
+a = [{0}];
+s = 0;
+sa bawat i sa [1:{1}] {{
+    s = s + a[i % 100] - a[(i * 7) % 100];
+}}
+ilimbag(s);
+'''.format(', '.join(str(number) for number in range(100)), size)
+
+def builtins(size):
+    return '''\
+a = [0];
+sa bawat i sa [1:{0}] {{
+    idagdag(a, halaga(i - 50));
+    palitan(a, 0, maximo(a[0], silipin(a)));
+}}
+ilimbag(haba(a), a[0]);
+'''.format(size)
+
+def strings(size):
+    return '''\
+s = "";
+sa bawat i sa [1:{0}] {{
+    s = s + titik(i % 10) + ",";
+}}
+ilimbag(haba(s));
+'''.format(size)
+
+def chains(size, branches=50):
+    clauses = ' ngunit '.join('kapag (x == {0}) {{\n        s = s + {0};\n    }}'.format(number)
+                              for number in range(branches))
+    return '''\
+s = 0;
+sa bawat i sa [1:{0}] {{
+    x = i % {1};
+    {2} kundiman {{
+        s = s - 1;
+    }}
+}}
+ilimbag(s);
+'''.format(size, branches + 1, clauses)
+
+def literals(size):
+    return 'a = [{}];\nilimbag(haba(a));\n'.format(', '.join(str(number) for number in range(size)))
+
+def program(name):
+    '''
+    Returns the source code of one of the PROGRAMS, which have a size of their own
+    '''
+    def read(size):
+        with open(os.path.join(PROGRAMS, name), 'r') as source:
+            return source.read()
+    return read
+
+# (name, source code of the given size, operations done by it, size at a scale of 1)
+CASES = [
+    ('hanoi', program('hanoi.asin'), lambda size: 2 ** 14 - 1, 1),
+    ('heapsort', program('heapsort.asin'), lambda size: 2000, 1),
+    ('arithmetic', arithmetic, lambda size: size, 200000),
+    ('indexing', indexing, lambda size: size, 100000),
+    ('builtins', builtins, lambda size: size, 50000),
+    ('strings', strings, lambda size: size, 20000),
+    ('chains', chains, lambda size: size, 20000),
+    ('literals', literals, lambda size: size, 50000),
+]
+
+class Timings(asintiming.Timings):
+    '''
+    Times the phases of running a program as ./asin --timing does (see asintiming.py),
+    and adds them up into the PHASES reported
+    '''
+    def phases(self):
+        '''
+        Returns the seconds spent in each of the PHASES
+        '''
+        return {phase: sum(self.timings.get(part, 0) for part in parts) for phase, parts in PHASES.items()}
+
+def measure(interpreter, timings, sourceCode, filename, backend, runs, cache):
+    '''
+    Runs the program the given number of times and returns the least time spent
+    in each phase, the peak memory allocated in one more run, and what it printed
+    '''
+    best = None
+    for run in range(runs):
+        # --compile's code objects are not to be loaded from the cache
+        shutil.rmtree(cache, ignore_errors=True)
+        timings.timings.clear()
+        output = io.StringIO()
+        interpreter.sibling(io.StringIO(), output).run(sourceCode, filename, backend)
+        phases = timings.phases()
+        best = phases if best is None else {phase: min(best[phase], phases[phase]) for phase in phases}
+
+    shutil.rmtree(cache, ignore_errors=True)
+    tracemalloc.start()
+    try:
+        interpreter.sibling(io.StringIO(), io.StringIO()).run(sourceCode, filename, backend)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak, output.getvalue()
+
+def version():
+    '''
+    Returns the commit of the interpreter being measured, if it can be told
+    '''
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def compare(results, path, threshold):
+    '''
+    Reports the change in the time of every case since the results saved in the
+    file. Returns the cases that got slower by more than the threshold (in percent)
+    '''
+    with open(path, 'r') as saved:
+        baseline = json.load(saved)
+    print('\nCompared with {} ({}):'.format(baseline['version'], path))
+    print('{:<24} {:>12} {:>12} {:>9}'.format('case', 'before (ms)', 'after (ms)', 'change'))
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline['results']:
+            continue
+        before = sum(baseline['results'][key]['seconds'].values())
+        after = sum(result['seconds'].values())
+        change = (after - before) / before * 100 if before else 0
+        slower = change > threshold
+        if slower:
+            regressions.append(key)
+        print('{:<24} {:>12.2f} {:>12.2f} {:>+8.1f}%{}'.format(
+            key, before * 1000, after * 1000, change, '  slower' if slower else ''))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the phases of running Asin programs')
+    parser.add_argument('cases', nargs='*', help='cases to run (default: all)')
+    parser.add_argument('--runs', type=int, default=3, help='runs per case and backend (default: 3)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies the size of generated cases')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='backends to run (default: all)')
+    parser.add_argument('--save', nargs='?', const='', default=None, help='write the results into a JSON file')
+    parser.add_argument('--compare', default=None, help='compare with results written by --save')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent slower to fail --compare at')
+    args = parser.parse_args()
+
+    names = [case[0] for case in CASES]
+    unknown = [name for name in args.cases if name not in names]
+    backends = args.backends.split(',')
+    unknown += [backend for backend in backends if backend not in BACKENDS]
+    if unknown:
+        parser.error('unknown cases or backends: {}; cases are {}'.format(', '.join(unknown), ', '.join(names)))
+
+    workspace = tempfile.mkdtemp(prefix='asinbench')
+    cache = os.path.join(workspace, 'cache')
+    timings = Timings()
+    # the lexer and the parser are built once (not timed), and shared by every run
+    interpreter = Interpreter(cached=False)
+    interpreter.build()
+    interpreter.timed, interpreter.separateLexing = timings, True
+    os.environ['ASIN_CACHE_DIR'] = cache
+
+    results = {}
+    mismatched = []
+    print('{:<24} {:>9} {:>9} {:>9} {:>9} {:>14} {:>11}'.format(
+        'case', 'lex ms', 'parse ms', 'compile', 'execute', 'ops/second', 'peak KiB'))
+    try:
+        for name, source, operations, size in CASES:
+            if args.cases and name not in args.cases:
+                continue
+            size = max(1, int(size * args.scale))
+            sourceCode = source(size)
+            filename = os.path.join(workspace, name + '.asin')
+            expected = None
+            for backend in backends:
+                seconds, peak, output = measure(interpreter, timings, sourceCode, filename, backend, args.runs, cache)
+                key = '{} {}'.format(name, backend)
+                if expected is None:
+                    expected = output
+                elif output != expected:
+                    mismatched.append(key)
+                ops = operations(size)
+                results[key] = {'size': size, 'operations': ops, 'seconds': seconds, 'peak': peak,
+                                'opsPerSecond': ops / seconds['execute'] if seconds['execute'] else None}
+                print('{:<24} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f} {:>14,.0f} {:>11,.0f}'.format(
+                    key, *(seconds[phase] * 1000 for phase in PHASES), results[key]['opsPerSecond'] or 0, peak / 1024))
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    if args.save is not None:
+        commit = version()
+        path = args.save or os.path.join(RESULTS, commit + '.json')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as saved:
+            json.dump({'version': commit, 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'python': platform.python_version(), 'runs': args.runs, 'scale': args.scale,
+                       'results': results}, saved, indent=1)
+        print('\nResults written into {}'.format(path))
+
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+    if mismatched:
+        print('The backends printed differently in: {}'.format(', '.join(mismatched)))
+    if regressions:
+        print('Slower by more than {}%: {}'.format(args.threshold, ', '.join(regressions)))
+    if mismatched or regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()